@@ -2,7 +2,7 @@
 Chapter Research API routes - Production-grade research with verification.
 """
 from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Literal
 from src.auth import get_current_user
 from src.database import get_prisma
@@ -23,13 +23,17 @@ class ChapterResearchRequest(BaseModel):
 
 class SubtopicResponse(BaseModel):
     """Subtopic with key points."""
+    model_config = ConfigDict(frozen=True)
+
     title: str
     description: str
-    key_points: list[str]
+    key_points: tuple[str, ...]
 
 
 class ImportantQuestionResponse(BaseModel):
     """Important question with answer."""
+    model_config = ConfigDict(frozen=True)
+
     question: str
     answer: str
     marks: int
@@ -45,7 +49,7 @@ class BoardQuestionResponse(BaseModel):
 
 class VerificationInfo(BaseModel):
     """Verification metadata."""
-    status: Literal["verified", "needs_review", "unreliable"]
+    status: Literal["verified", "needs_review", "unreliable", "unverified"]
     confidence_score: float
     syllabus_alignment: float
     completeness: float
@@ -63,13 +67,15 @@ class ChapterResearchResponse(BaseModel):
     """Response model for chapter research."""
     chapter_name: str
     subject: str
-    subtopics: list[SubtopicResponse]
-    important_questions: list[ImportantQuestionResponse]
-    board_questions: list[BoardQuestionResponse]
-    quick_notes: list[str]
-    mnemonics: list[str] | None
-    sources: list[SourceInfo]
+    subtopics: tuple[SubtopicResponse, ...]
+    important_questions: tuple[ImportantQuestionResponse, ...]
+    board_questions: tuple[BoardQuestionResponse, ...]
+    quick_notes: tuple[str, ...]
+    mnemonics: tuple[str, ...] | None
+    sources: tuple[SourceInfo, ...]
     verification: VerificationInfo
+    fast_path: bool = False  # Syllabus and accuracy layers were skipped
+    cache_tier: Literal["memory", "redis"] | None = None  # None when freshly researched
     warnings: list[str] | None
     processing_time_ms: int
     generated_at: str
@@ -162,6 +168,8 @@ async def research_chapter(
                 completeness=result["verification"]["completeness"],
                 question_authenticity=result["verification"]["question_authenticity"],
             ),
+            fast_path=result.get("fast_path", False),
+            cache_tier=result.get("cache_tier"),
             warnings=result.get("warnings"),
             processing_time_ms=result["processing_time_ms"],
             generated_at=result["generated_at"],
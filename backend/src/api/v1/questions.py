@@ -70,7 +70,8 @@ async def ask_question(
             chapter=chapter_name,
         )
         
-        # Create answer record
+        # Create answer record (on the fast path, layers 2-4 were not run and
+        # their stored outputs carry derived=True)
         answer = await prisma.answer.create(
             data={
                 "questionId": question.id,
@@ -1,6 +1,8 @@
 """
 Application configuration using Pydantic Settings.
 """
+import os
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -19,11 +21,33 @@ class Settings(BaseSettings):
     # AI Providers - Gemini Primary, Groq Fallback
     gemini_api_key: str | None = None
     groq_api_key: str | None = None
+    llm_hedge_delay_ms: int = 2000  # hedge delay until Gemini's P95 latency is known
+    
+    # Provider rate limits per API key (free-tier defaults), split evenly across
+    # the WEB_CONCURRENCY worker processes
+    gemini_max_requests_per_minute: int = 30
+    gemini_max_tokens_per_minute: int = 1_000_000
+    groq_max_requests_per_minute: int = 30
+    groq_max_tokens_per_minute: int = 12_000
+    max_concurrent_llm: int = 32  # in-flight generations per process
+    
+    # Chapter research skips layers 2/3 when layer 1 is at least this confident
+    research_fast_path_confidence: float = 0.9
+    
+    # Question pipeline skips layers 2-4 when layer 1 is at least this confident
+    # on a chapter that has already produced high-scoring answers
+    fast_path_confidence_threshold: float = 0.95
     
     # Web Search - SerpAPI for real-time Google search
     serpapi_key: str | None = None
+    max_concurrent_searches: int = 8  # in-flight SerpAPI calls per process
+    
+    # Cache - optional Redis shared by all workers (e.g. redis://localhost:6379/0)
+    redis_url: str | None = None
     
     # App
+    environment: str = "development"  # "production" runs multiple workers without reload
+    web_concurrency: int = Field(default_factory=lambda: os.cpu_count() or 1)
     debug: bool = False
     max_llm_timeout: int = 300  # seconds (5 minutes for deep research)
     max_retries: int = 2
@@ -0,0 +1,64 @@
+"""
+Shared httpx client for outbound API calls.
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable
+import httpx
+from src.config import get_settings
+
+settings = get_settings()
+
+# Transient statuses worth retrying before giving up (or failing over)
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+MAX_BACKOFF_SECONDS = 30
+
+# Global client instance, reused so connections and TLS sessions are pooled
+http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP client."""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=settings.max_llm_timeout,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client."""
+    global http_client
+    if http_client is not None and not http_client.is_closed:
+        await http_client.aclose()
+    http_client = None
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before the next attempt: Retry-After if given, else exponential backoff with jitter."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass  # HTTP-date form - fall back to backoff
+    return min(2 ** attempt + random.random(), MAX_BACKOFF_SECONDS)
+
+
+async def send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    max_retries: int = settings.max_retries,
+) -> httpx.Response:
+    """
+    Call `send` and retry transient 429/5xx responses.
+    
+    Returns the final response; non-retriable or exhausted errors are left to the caller.
+    """
+    for attempt in range(max_retries + 1):
+        response = await send()
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+            return response
+        await asyncio.sleep(_retry_delay(response, attempt))
@@ -9,6 +9,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.config import get_settings
 from src.database import get_prisma, disconnect_prisma
+from src.http_client import close_http_client
+from src.redis_client import close_redis
 from src.api.v1 import router as api_v1_router
 from src.models.schemas import HealthCheckResponse
 
@@ -27,6 +29,8 @@ async def lifespan(app: FastAPI):
     print("🛑 Shutting down...")
     await disconnect_prisma()
     print("✅ Database disconnected")
+    await close_http_client()
+    await close_redis()
 
 
 app = FastAPI(
@@ -73,4 +77,7 @@ app.include_router(api_v1_router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
+    if settings.environment == "production":
+        uvicorn.run("src.main:app", host="0.0.0.0", port=8000, workers=settings.web_concurrency, loop="uvloop")
+    else:
+        uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,23 +1,22 @@
 """
 Pydantic models for request/response validation.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Any, Literal
 
 
+class FrozenResponseModel(BaseModel):
+    """Immutable base for response models allocated once per answered question."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
 # ============== Auth Schemas ==============
 
 class LoginRequest(BaseModel):
     access_code: str = Field(..., min_length=4, max_length=50, description="User access code")
 
 
-class LoginResponse(BaseModel):
-    access_token: str
-    token_type: str = "bearer"
-    user: "UserResponse"
-
-
 class UserResponse(BaseModel):
     id: str
     access_code: str
@@ -27,6 +26,12 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class LoginResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    user: UserResponse
+
+
 # ============== Subject Schemas ==============
 
 class SubjectResponse(BaseModel):
@@ -58,33 +63,36 @@ class AskQuestionRequest(BaseModel):
     question_text: str = Field(..., min_length=10, max_length=5000)
 
 
-class Layer1Output(BaseModel):
+class Layer1Output(FrozenResponseModel):
     answer: str
-    key_points: list[str]
-    referenced_concepts: list[str]
+    key_points: tuple[str, ...]
+    referenced_concepts: tuple[str, ...]
     confidence: float = Field(..., ge=0, le=1)
 
 
-class Layer2Output(BaseModel):
+class Layer2Output(FrozenResponseModel):
     syllabus_alignment: str
-    missing_keywords: list[str]
-    irrelevant_points: list[str]
+    missing_keywords: tuple[str, ...]
+    irrelevant_points: tuple[str, ...]
     alignment_score: float = Field(..., ge=0, le=100)
+    derived: bool = False  # Filled in by the pipeline's fast path, not reviewed by the LLM
 
 
-class Layer3Output(BaseModel):
-    logical_errors: list[str]
+class Layer3Output(FrozenResponseModel):
+    logical_errors: tuple[str, ...]
     severity: Literal["none", "low", "medium", "high"]
+    derived: bool = False  # Filled in by the pipeline's fast path, not reviewed by the LLM
 
 
-class Layer4Output(BaseModel):
+class Layer4Output(FrozenResponseModel):
     predicted_score: float = Field(..., ge=0, le=100)
     max_marks: int = Field(..., ge=1, le=100)
     score_percentage: float = Field(..., ge=0, le=100)
-    missing_components: list[str]
+    missing_components: tuple[str, ...]
+    derived: bool = False  # Estimated by the pipeline, not scored by the LLM
 
 
-class AnswerResponse(BaseModel):
+class AnswerResponse(FrozenResponseModel):
     id: str
     question_id: str
     layer1_output: Layer1Output
@@ -93,17 +101,14 @@ class AnswerResponse(BaseModel):
     layer4_output: Layer4Output
     final_answer: str
     confidence_score: float
-    referenced_concepts: list[str]
+    referenced_concepts: tuple[str, ...]
     retries: int
     processing_time_ms: int | None
     status: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
-class QuestionResponse(BaseModel):
+class QuestionResponse(FrozenResponseModel):
     id: str
     user_id: str
     subject_id: str
@@ -114,9 +119,6 @@ class QuestionResponse(BaseModel):
     chapter: ChapterResponse | None = None
     answer: AnswerResponse | None = None
 
-    class Config:
-        from_attributes = True
-
 
 class QuestionHistoryResponse(BaseModel):
     questions: list[QuestionResponse]
@@ -150,7 +152,3 @@ class HealthCheckResponse(BaseModel):
     status: str
     timestamp: datetime
     version: str = "2.0.0"
-
-
-# Update forward references
-LoginResponse.model_rebuild()
@@ -0,0 +1,26 @@
+"""
+Optional shared Redis client, used as a second-tier cache across workers and restarts.
+"""
+from redis.asyncio import Redis
+from src.config import get_settings
+
+settings = get_settings()
+
+# Global client instance; stays None when REDIS_URL isn't configured
+redis_client: Redis | None = None
+
+
+def get_redis() -> Redis | None:
+    """Get or create the shared Redis client (None if Redis isn't configured)."""
+    global redis_client
+    if redis_client is None and settings.redis_url:
+        redis_client = Redis.from_url(settings.redis_url)
+    return redis_client
+
+
+async def close_redis():
+    """Close the shared Redis client."""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+    redis_client = None
@@ -2,16 +2,210 @@
 Chapter Research Service - Production-grade CBSE chapter research with verification.
 Combines web search + Groq AI with 4-layer verification for accuracy.
 """
-import json
+import re
 import time
 import asyncio
+import statistics
+from collections import deque
+from datetime import datetime, timezone
+from string import Template
 from typing import Any
+import msgspec
+import orjson
+from cachetools import TTLCache
 from src.config import get_settings
-from src.services.llm_service import get_llm_service
-from src.services.web_search_service import get_web_search_service
+from src.redis_client import get_redis
+from src.services.llm_service import LLMOutputError, get_llm_service
+from src.services.web_search_service import SearchSource, get_web_search_service
 
 settings = get_settings()
 
+# Bump when prompts or the result shape change to invalidate cached research
+RESEARCH_CACHE_VERSION = "v2"
+RESEARCH_CACHE_MAXSIZE = 256
+RESEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# max_tokens auto-tuning: budgets start at (and never exceed) these ceilings and
+# shrink towards 1.3x the rolling P95 of observed completion lengths per layer
+LAYER_MAX_TOKENS = {1: 4000, 2: 2000, 3: 2000, 4: 6000}
+MAX_TOKENS_FLOOR = 512
+MAX_TOKENS_SAMPLE_SIZE = 100
+MAX_TOKENS_RETUNE_EVERY = 10
+
+_DIGITS_RE = re.compile(r"\d+")
+
+
+# LLM JSON is loose: a field may be null, a list may arrive as one string, a
+# number as text. These coerce a decoded value into the shape the service reads.
+def _text(value: Any, default: str = "") -> str:
+    """A scalar as text; null and nested objects fall back to `default`."""
+    if value is None or isinstance(value, (dict, list)):
+        return default
+    return value if isinstance(value, str) else str(value)
+
+
+def _text_list(value: Any) -> list[str]:
+    """A list of strings from a list, a single string, an object or null."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, dict):
+        value = list(value.values())
+    elif not isinstance(value, (list, tuple)):
+        return [str(value)]
+    
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            item = " - ".join(_text(v) for v in item.values() if _text(v))
+        elif isinstance(item, list):
+            item = ", ".join(_text_list(item))
+        else:
+            item = _text(item)
+        if item:
+            items.append(item)
+    return items
+
+
+def _number(value: Any, default: float = 0) -> float:
+    """A number from a number or numeric text ("85", "85%"); anything else gives `default`."""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(_text(value).strip().rstrip("%"))
+    except ValueError:
+        return default
+
+
+def _marks(value: Any, default: int = 4) -> int:
+    """Marks from a number or text like "4 marks"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+        return int(value)
+    match = _DIGITS_RE.search(_text(value))
+    return int(match.group()) if match and int(match.group()) > 0 else default
+
+
+# Typed layer results, decoded straight from the LLM's JSON text. Only the
+# fields the service reads are declared (msgspec skips the rest); they decode
+# as Any and are coerced in __post_init__, so one malformed field falls back to
+# its default instead of failing the whole layer.
+class Subtopic(msgspec.Struct):
+    title: Any = ""
+    description: Any = ""
+    key_points: Any = ()
+    
+    def __post_init__(self):
+        self.title = _text(self.title)
+        self.description = _text(self.description)
+        self.key_points = _text_list(self.key_points)
+
+
+def _subtopics(value: Any) -> list[Subtopic]:
+    """Subtopic objects (or bare titles) from the layer 1 response."""
+    if not isinstance(value, list):
+        value = [value] if isinstance(value, dict) else []
+    subtopics = []
+    for item in value:
+        if isinstance(item, dict):
+            subtopics.append(msgspec.convert(item, Subtopic, strict=False))
+        elif _text(item):
+            subtopics.append(Subtopic(title=item))
+    return subtopics
+
+
+class Layer1Result(msgspec.Struct):
+    subtopics: Any = ()
+    quick_notes: Any = ()
+    mnemonics: Any = ()
+    confidence: Any = 0.0
+    warnings: Any = ()
+    
+    def __post_init__(self):
+        self.subtopics = _subtopics(self.subtopics)
+        self.quick_notes = _text_list(self.quick_notes)
+        self.mnemonics = _text_list(self.mnemonics)
+        self.confidence = _number(self.confidence, 0.0)
+        self.warnings = _text_list(self.warnings)
+
+
+class Layer2Result(msgspec.Struct):
+    syllabus_alignment_score: Any = 0
+    missing_cbse_concepts: Any = ()
+    verification_status: Any = "needs_review"
+    error: Any = None  # Set by the fallback when the LLM call fails
+    
+    def __post_init__(self):
+        self.syllabus_alignment_score = _number(self.syllabus_alignment_score)
+        self.missing_cbse_concepts = _text_list(self.missing_cbse_concepts)
+        self.verification_status = _text(self.verification_status, "needs_review") or "needs_review"
+
+
+class Layer3Result(msgspec.Struct):
+    factual_issues: Any = ()
+    completeness_score: Any = 0
+    error: Any = None  # Set by the fallback when the LLM call fails
+    
+    def __post_init__(self):
+        self.factual_issues = _text_list(self.factual_issues)
+        self.completeness_score = _number(self.completeness_score)
+
+
+class GeneratedQuestion(msgspec.Struct):
+    question: Any = ""
+    answer: Any = ""
+    marks: Any = 4
+    type: Any = "short"
+    
+    def __post_init__(self):
+        self.question = _text(self.question)
+        self.answer = _text(self.answer)
+        self.marks = _marks(self.marks)
+        self.type = _text(self.type, "short") or "short"
+
+
+class Layer4Result(msgspec.Struct):
+    important_questions: Any = ()
+    question_authenticity_score: Any = 0
+    error: Any = None  # Set by the fallback when the LLM call fails
+    
+    def __post_init__(self):
+        questions = self.important_questions
+        if not isinstance(questions, list):
+            questions = [questions] if isinstance(questions, dict) else []
+        self.important_questions = [
+            msgspec.convert(q, GeneratedQuestion, strict=False)
+            for q in questions
+            if isinstance(q, dict)
+        ]
+        self.question_authenticity_score = _number(self.question_authenticity_score)
+
+
+# One reusable decoder per layer
+LAYER_DECODERS = {
+    layer: msgspec.json.Decoder(result_type, strict=False)
+    for layer, result_type in (
+        (1, Layer1Result), (2, Layer2Result), (3, Layer3Result), (4, Layer4Result)
+    )
+}
+
+# Stand-in layer 2/3 results used when the high-confidence fast path skips them;
+# the scores are assumed, so the status says the content wasn't verified
+FAST_PATH_LAYER2_RESULT = Layer2Result(syllabus_alignment_score=90, verification_status="unverified")
+FAST_PATH_LAYER3_RESULT = Layer3Result(completeness_score=90)
+
+# Search text sent to layer 1 is clipped per snippet to keep prompt tokens down
+SNIPPET_CLIP_CHARS = 500
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _clip(text: str, limit: int = SNIPPET_CLIP_CHARS) -> str:
+    """Collapse runs of whitespace and truncate to `limit` characters."""
+    # Collapsing only shrinks text, so 2x the limit is enough input to fill it
+    return _WHITESPACE_RE.sub(" ", text[: limit * 2]).strip()[:limit]
+
 
 # System prompts for chapter research verification layers
 CHAPTER_LAYER1_SYSTEM_PROMPT = """You are an expert CBSE Class 12 Commerce curriculum designer with 20+ years of experience.
@@ -71,6 +265,88 @@ Respond in JSON format with:
 - year_wise_distribution: Object with years as keys and question counts as values"""
 
 
+# User prompt templates for each layer, compiled once at import
+CHAPTER_LAYER1_PROMPT_TEMPLATE = Template("""SUBJECT: ${subject}
+CHAPTER: ${chapter_name}
+
+SEARCH RESULTS FROM WEB:
+${sources_text}
+
+CONTENT SNIPPETS:
+${snippets_text}
+
+Based on the above search results, extract comprehensive chapter content following CBSE Class 12 standards.
+
+IMPORTANT: 
+- If search results are empty or insufficient, use your knowledge but set confidence appropriately
+- Clearly mark any information you're uncertain about
+- Include ALL subtopics that belong to this chapter
+
+Respond with JSON containing:
+- chapter_name
+- subject
+- subtopics (array with title, description, key_points array)
+- quick_notes (bullet points)
+- mnemonics (memory aids)
+- confidence (0-1)
+- warnings (array of uncertainties)""")
+
+CHAPTER_LAYER2_PROMPT_TEMPLATE = Template("""SUBJECT: ${subject}
+CHAPTER: ${chapter_name}
+
+PROPOSED CONTENT:
+${subtopics_summary}
+
+Verify this content against CBSE Class 12 official syllabus:
+1. Is this the correct sequence of subtopics?
+2. Are all required CBSE concepts present?
+3. Is there any content that doesn't belong?
+
+Respond with JSON containing:
+- syllabus_alignment_score (0-100)
+- missing_cbse_concepts (array)
+- incorrect_content (array)
+- suggested_corrections (array)
+- verification_status ("verified", "needs_review", or "unreliable")""")
+
+CHAPTER_LAYER3_PROMPT_TEMPLATE = Template("""SUBJECT: ${subject}
+CHAPTER: ${chapter_name}
+
+CONTENT TO AUDIT:
+${content_summary}
+
+Audit this content for:
+1. Logical consistency
+2. Factual accuracy
+3. Completeness for Class 12 level
+
+Respond with JSON containing:
+- logical_errors (array)
+- factual_issues (array)
+- completeness_score (0-100)
+- recommendations (array)""")
+
+CHAPTER_LAYER4_PROMPT_TEMPLATE = Template("""SUBJECT: ${subject}
+CHAPTER: ${chapter_name}
+
+CHAPTER SUBTOPICS:
+${subtopics_json}
+
+ACTUAL BOARD QUESTIONS FOUND ONLINE:
+${real_questions_text}
+
+Based on the chapter content and typical CBSE patterns, generate:
+1. 4-6 important questions with complete answers
+2. Include question types: short (2-3 marks), long (4-6 marks)
+3. Make questions board-exam realistic
+4. Provide detailed CBSE-style answers
+
+Respond with JSON containing:
+- important_questions (array of {question, answer, marks, type})
+- question_authenticity_score (0-100)
+- year_wise_distribution (object)""")
+
+
 class ChapterResearchService:
     """
     Production-grade chapter research with 4-layer verification.
@@ -78,9 +354,11 @@ class ChapterResearchService:
     Flow:
     1. Web search for CBSE content
     2. Layer 1: Extract and structure content from search results
-    3. Layer 2: Verify against CBSE syllabus
-    4. Layer 3: Audit for accuracy and completeness
-    5. Layer 4: Generate board questions
+    3. Layers 2-4 (concurrently):
+       - Layer 2: Verify against CBSE syllabus
+       - Layer 3: Audit for accuracy and completeness
+       - Layer 4: Generate board questions
+       (layers 2-3 are skipped when layer 1 is highly confident)
     6. Final aggregation with confidence scoring
     """
     
@@ -88,6 +366,83 @@ class ChapterResearchService:
         self.llm = get_llm_service()
         self.web_search = get_web_search_service()
         self.max_retries = 2
+        self._cache: TTLCache = TTLCache(
+            maxsize=RESEARCH_CACHE_MAXSIZE, ttl=RESEARCH_CACHE_TTL_SECONDS
+        )
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._p95_tokens = dict(LAYER_MAX_TOKENS)
+        self._observed_tokens = {
+            layer: deque(maxlen=MAX_TOKENS_SAMPLE_SIZE) for layer in LAYER_MAX_TOKENS
+        }
+        self._token_updates = dict.fromkeys(LAYER_MAX_TOKENS, 0)
+    
+    async def _generate(self, layer: int, **kwargs) -> msgspec.Struct:
+        """
+        Call the LLM with the layer's tuned max_tokens and decoder, and record its usage.
+        
+        Output that was truncated or didn't decode suggests the tuned budget is
+        too tight: the budget goes back to the layer's ceiling and the call is
+        retried once at it. Other failures (network, rate limits) leave it alone.
+        """
+        budget = self._p95_tokens[layer]
+        try:
+            result, completion_tokens = await self.llm.generate_json_with_usage(
+                max_tokens=budget, decoder=LAYER_DECODERS[layer], **kwargs
+            )
+        except LLMOutputError:
+            full_budget = LAYER_MAX_TOKENS[layer]
+            self._p95_tokens[layer] = full_budget
+            if budget >= full_budget:
+                raise
+            print(f"⚠️  Layer {layer} output truncated or malformed at {budget} tokens, retrying at {full_budget}")
+            result, completion_tokens = await self.llm.generate_json_with_usage(
+                max_tokens=full_budget, decoder=LAYER_DECODERS[layer], **kwargs
+            )
+        
+        if completion_tokens:
+            self._record_tokens(layer, completion_tokens)
+        return result
+    
+    def _record_tokens(self, layer: int, completion_tokens: int):
+        """Add a completion length sample and periodically re-tune the layer's budget."""
+        samples = self._observed_tokens[layer]
+        samples.append(completion_tokens)
+        self._token_updates[layer] += 1
+        
+        if self._token_updates[layer] % MAX_TOKENS_RETUNE_EVERY or len(samples) < 2:
+            return
+        
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        self._p95_tokens[layer] = max(
+            MAX_TOKENS_FLOOR, min(LAYER_MAX_TOKENS[layer], int(1.3 * p95))
+        )
+    
+    @staticmethod
+    def _cache_key(subject: str, chapter_name: str) -> str:
+        """Build the versioned cache key for a chapter (shared by the in-process and Redis tiers)."""
+        return f"{RESEARCH_CACHE_VERSION}:chapter:{subject.lower().strip()}:{chapter_name.lower().strip()}"
+    
+    async def _redis_get(self, key: str) -> dict[str, Any] | None:
+        """Read cached research from Redis; best-effort, any failure counts as a miss."""
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(key)
+            return orjson.loads(raw) if raw else None
+        except Exception as e:
+            print(f"⚠️  Redis cache read failed: {str(e)}")
+            return None
+    
+    async def _redis_set(self, key: str, result: dict[str, Any]):
+        """Write research to Redis with the cache TTL; best-effort."""
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.setex(key, RESEARCH_CACHE_TTL_SECONDS, orjson.dumps(result))
+        except Exception as e:
+            print(f"⚠️  Redis cache write failed: {str(e)}")
     
     async def research_chapter(
         self,
@@ -104,9 +459,61 @@ class ChapterResearchService:
             user_serpapi_key: Optional user's personal SerpAPI key
             
         Returns:
-            Dictionary with verified chapter content
+            Dictionary with verified chapter content; cache_tier records which
+            cache served it ("memory", "redis", or None when freshly researched)
         """
-        start_time = time.time()
+        key = self._cache_key(subject, chapter_name)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return {**cached, "cache_tier": "memory"}
+        
+        # Single-flight: concurrent requests for the same chapter await one shared run
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load_research(key, subject, chapter_name, user_serpapi_key)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        
+        # Shielded so one caller disconnecting doesn't cancel the run for the others
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, key: str, task: asyncio.Task):
+        """Drop a finished run from the in-flight map."""
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter went away
+    
+    async def _load_research(
+        self,
+        key: str,
+        subject: str,
+        chapter_name: str,
+        user_serpapi_key: str | None,
+    ) -> dict[str, Any]:
+        """Serve from Redis or run the pipeline, filling both cache tiers."""
+        cached = await self._redis_get(key)
+        if cached is not None:
+            self._cache[key] = cached
+            return {**cached, "cache_tier": "redis"}
+        
+        result = await self._run_research(subject, chapter_name, user_serpapi_key)
+        
+        # Don't pin failed research in the cache
+        if result.get("subtopics") or result.get("important_questions"):
+            self._cache[key] = result
+            await self._redis_set(key, result)
+        return {**result, "cache_tier": None}
+    
+    async def _run_research(
+        self,
+        subject: str,
+        chapter_name: str,
+        user_serpapi_key: str | None,
+    ) -> dict[str, Any]:
+        """Run the full search + 4-layer pipeline for a chapter (cache miss path)."""
+        start_time = time.perf_counter()
         
         # Use user's SerpAPI key if provided, otherwise use system key
         if user_serpapi_key:
@@ -128,20 +535,34 @@ class ChapterResearchService:
             subject, chapter_name, general_results
         )
         
-        # Step 3: Layer 2 - CBSE Syllabus Verification
-        layer2_result = await self._layer2_verify_syllabus(
-            subject, chapter_name, layer1_result
-        )
-        
-        # Step 4: Layer 3 - Accuracy Audit
-        layer3_result = await self._layer3_audit_accuracy(
-            subject, chapter_name, layer1_result
+        # Fast path: a confident, warning-free extraction grounded in search results
+        # rarely changes under layers 2/3, so only the additive layer 4 is run
+        fast_path = (
+            has_search_data
+            and layer1_result.confidence >= settings.research_fast_path_confidence
+            and not layer1_result.warnings
         )
         
-        # Step 5: Layer 4 - Board Questions Generation
-        layer4_result = await self._layer4_generate_questions(
-            subject, chapter_name, layer1_result, board_questions
-        )
+        if fast_path:
+            print(f"⚡ Fast path for {subject} / {chapter_name}: skipping syllabus and accuracy layers")
+            layer2_result = FAST_PATH_LAYER2_RESULT
+            layer3_result = FAST_PATH_LAYER3_RESULT
+            layer4_result = await self._layer4_generate_questions(
+                subject, chapter_name, layer1_result, board_questions
+            )
+        else:
+            # Steps 3-5: Layers 2-4 only depend on layer 1, so run them concurrently
+            # (each layer falls back to a default result on LLM failure)
+            layer2_result, layer3_result, layer4_result = await asyncio.gather(
+                # Layer 2 - CBSE Syllabus Verification
+                self._layer2_verify_syllabus(subject, chapter_name, layer1_result),
+                # Layer 3 - Accuracy Audit
+                self._layer3_audit_accuracy(subject, chapter_name, layer1_result),
+                # Layer 4 - Board Questions Generation
+                self._layer4_generate_questions(
+                    subject, chapter_name, layer1_result, board_questions
+                ),
+            )
         
         # Step 6: Aggregate results with confidence scoring
         final_result = self._aggregate_results(
@@ -155,6 +576,7 @@ class ChapterResearchService:
             board_questions,
             start_time,
         )
+        final_result["fast_path"] = fast_path
         
         return final_result
     
@@ -163,171 +585,117 @@ class ChapterResearchService:
         subject: str,
         chapter_name: str,
         search_results: dict[str, Any],
-    ) -> dict[str, Any]:
+    ) -> Layer1Result:
         """Layer 1: Extract and structure content from search results."""
         
         # Build context from search results
-        sources_text = "\n\n".join([
-            f"Source: {s['source']}\nTitle: {s['title']}\nSnippet: {s['snippet']}"
-            for s in search_results.get("sources", [])[:10]
-        ])
+        sources = search_results.get("sources", [])[:10]
+        sources_text = "\n\n".join(
+            f"Source: {s.source}\nTitle: {_clip(s.title)}\nSnippet: {_clip(s.snippet)}"
+            for s in sources
+        )
         
-        snippets_text = "\n".join(search_results.get("content_snippets", [])[:20])
+        # Snippets of the sources above are already in the prompt once
+        seen_snippets = {s.snippet for s in sources}
+        snippets_text = "\n".join(
+            _clip(snippet)
+            for snippet in search_results.get("content_snippets", [])[:20]
+            if snippet not in seen_snippets
+        )
         
-        prompt = f"""SUBJECT: {subject}
-CHAPTER: {chapter_name}
-
-SEARCH RESULTS FROM WEB:
-{sources_text}
-
-CONTENT SNIPPETS:
-{snippets_text}
-
-Based on the above search results, extract comprehensive chapter content following CBSE Class 12 standards.
-
-IMPORTANT: 
-- If search results are empty or insufficient, use your knowledge but set confidence appropriately
-- Clearly mark any information you're uncertain about
-- Include ALL subtopics that belong to this chapter
-
-Respond with JSON containing:
-- chapter_name
-- subject
-- subtopics (array with title, description, key_points array)
-- quick_notes (bullet points)
-- mnemonics (memory aids)
-- confidence (0-1)
-- warnings (array of uncertainties)"""
+        prompt = CHAPTER_LAYER1_PROMPT_TEMPLATE.substitute(
+            subject=subject,
+            chapter_name=chapter_name,
+            sources_text=sources_text,
+            snippets_text=snippets_text,
+        )
         
         try:
-            result = await self.llm.generate_json(
+            result = await self._generate(
+                1,
                 prompt=prompt,
                 system_message=CHAPTER_LAYER1_SYSTEM_PROMPT,
                 temperature=0.3,
-                max_tokens=4000,
             )
             return result
         except Exception as e:
             # Fallback if LLM fails
-            return {
-                "chapter_name": chapter_name,
-                "subject": subject,
-                "subtopics": [],
-                "quick_notes": [],
-                "mnemonics": [],
-                "confidence": 0.0,
-                "warnings": [f"Content extraction failed: {str(e)}"],
-            }
+            return Layer1Result(warnings=[f"Content extraction failed: {str(e)}"])
     
     async def _layer2_verify_syllabus(
         self,
         subject: str,
         chapter_name: str,
-        layer1_result: dict[str, Any],
-    ) -> dict[str, Any]:
+        layer1_result: Layer1Result,
+    ) -> Layer2Result:
         """Layer 2: Verify against CBSE syllabus standards."""
         
         subtopics_summary = "\n".join([
-            f"- {st.get('title', 'Unknown')}: {st.get('description', '')[:100]}..."
-            for st in layer1_result.get("subtopics", [])[:10]
+            f"- {st.title or 'Unknown'}: {st.description[:100]}..."
+            for st in layer1_result.subtopics[:10]
         ])
         
-        prompt = f"""SUBJECT: {subject}
-CHAPTER: {chapter_name}
-
-PROPOSED CONTENT:
-{subtopics_summary}
-
-Verify this content against CBSE Class 12 official syllabus:
-1. Is this the correct sequence of subtopics?
-2. Are all required CBSE concepts present?
-3. Is there any content that doesn't belong?
-
-Respond with JSON containing:
-- syllabus_alignment_score (0-100)
-- missing_cbse_concepts (array)
-- incorrect_content (array)
-- suggested_corrections (array)
-- verification_status ("verified", "needs_review", or "unreliable")"""
+        prompt = CHAPTER_LAYER2_PROMPT_TEMPLATE.substitute(
+            subject=subject,
+            chapter_name=chapter_name,
+            subtopics_summary=subtopics_summary,
+        )
         
         try:
-            result = await self.llm.generate_json(
+            result = await self._generate(
+                2,
                 prompt=prompt,
                 system_message=CHAPTER_LAYER2_SYSTEM_PROMPT,
                 temperature=0.2,
-                max_tokens=2000,
             )
             return result
         except Exception as e:
-            return {
-                "syllabus_alignment_score": 0,
-                "missing_cbse_concepts": [],
-                "incorrect_content": [],
-                "suggested_corrections": [],
-                "verification_status": "unreliable",
-                "error": str(e),
-            }
+            return Layer2Result(verification_status="unreliable", error=str(e))
     
     async def _layer3_audit_accuracy(
         self,
         subject: str,
         chapter_name: str,
-        layer1_result: dict[str, Any],
-    ) -> dict[str, Any]:
+        layer1_result: Layer1Result,
+    ) -> Layer3Result:
         """Layer 3: Audit for accuracy and completeness."""
         
-        content_summary = json.dumps({
+        # Compact JSON: indentation only adds prompt tokens
+        content_summary = orjson.dumps({
             "subtopics": [
-                {"title": st.get("title"), "points": st.get("key_points", [])[:3]}
-                for st in layer1_result.get("subtopics", [])[:5]
+                {"title": st.title, "points": st.key_points[:3]}
+                for st in layer1_result.subtopics[:5]
             ],
-            "quick_notes": layer1_result.get("quick_notes", [])[:5],
-        }, indent=2)
+            "quick_notes": layer1_result.quick_notes[:5],
+        }).decode()
         
-        prompt = f"""SUBJECT: {subject}
-CHAPTER: {chapter_name}
-
-CONTENT TO AUDIT:
-{content_summary}
-
-Audit this content for:
-1. Logical consistency
-2. Factual accuracy
-3. Completeness for Class 12 level
-
-Respond with JSON containing:
-- logical_errors (array)
-- factual_issues (array)
-- completeness_score (0-100)
-- recommendations (array)"""
+        prompt = CHAPTER_LAYER3_PROMPT_TEMPLATE.substitute(
+            subject=subject,
+            chapter_name=chapter_name,
+            content_summary=content_summary,
+        )
         
         try:
-            result = await self.llm.generate_json(
+            result = await self._generate(
+                3,
                 prompt=prompt,
                 system_message=CHAPTER_LAYER3_SYSTEM_PROMPT,
                 temperature=0.2,
-                max_tokens=2000,
             )
             return result
         except Exception as e:
-            return {
-                "logical_errors": [],
-                "factual_issues": [],
-                "completeness_score": 0,
-                "recommendations": [],
-                "error": str(e),
-            }
+            return Layer3Result(error=str(e))
     
     async def _layer4_generate_questions(
         self,
         subject: str,
         chapter_name: str,
-        layer1_result: dict[str, Any],
+        layer1_result: Layer1Result,
         web_board_questions: list[dict],
-    ) -> dict[str, Any]:
+    ) -> Layer4Result:
         """Layer 4: Generate board questions and verify authenticity."""
         
-        subtopics_list = [st.get("title", "") for st in layer1_result.get("subtopics", [])[:8]]
+        subtopics_list = [st.title for st in layer1_result.subtopics[:8]]
         
         # Include real board questions found online as examples
         real_questions_text = "\n".join([
@@ -335,136 +703,114 @@ Respond with JSON containing:
             for q in web_board_questions[:10]
         ])
         
-        prompt = f"""SUBJECT: {subject}
-CHAPTER: {chapter_name}
-
-CHAPTER SUBTOPICS:
-{json.dumps(subtopics_list, indent=2)}
-
-ACTUAL BOARD QUESTIONS FOUND ONLINE:
-{real_questions_text if real_questions_text else "(No specific questions found in search)"}
-
-Based on the chapter content and typical CBSE patterns, generate:
-1. 4-6 important questions with complete answers
-2. Include question types: short (2-3 marks), long (4-6 marks)
-3. Make questions board-exam realistic
-4. Provide detailed CBSE-style answers
-
-Respond with JSON containing:
-- important_questions (array of {{question, answer, marks, type}})
-- question_authenticity_score (0-100)
-- year_wise_distribution (object)"""
+        prompt = CHAPTER_LAYER4_PROMPT_TEMPLATE.substitute(
+            subject=subject,
+            chapter_name=chapter_name,
+            subtopics_json=orjson.dumps(subtopics_list).decode(),
+            real_questions_text=real_questions_text or "(No specific questions found in search)",
+        )
         
         try:
-            result = await self.llm.generate_json(
+            result = await self._generate(
+                4,
                 prompt=prompt,
                 system_message=CHAPTER_LAYER4_SYSTEM_PROMPT,
                 temperature=0.4,
-                max_tokens=6000,
             )
             return result
         except Exception as e:
-            return {
-                "important_questions": [],
-                "question_authenticity_score": 0,
-                "year_wise_distribution": {},
-                "error": str(e),
-            }
+            return Layer4Result(error=str(e))
     
     def _aggregate_results(
         self,
         subject: str,
         chapter_name: str,
-        layer1: dict[str, Any],
-        layer2: dict[str, Any],
-        layer3: dict[str, Any],
-        layer4: dict[str, Any],
-        sources: list[dict],
+        layer1: Layer1Result,
+        layer2: Layer2Result,
+        layer3: Layer3Result,
+        layer4: Layer4Result,
+        sources: list[SearchSource],
         web_board_questions: list[dict],
         start_time: float,
     ) -> dict[str, Any]:
         """Aggregate all layers and calculate final confidence."""
         
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        # Calculate overall confidence
-        confidence_factors = [
-            layer1.get("confidence", 0) * 100,
-            layer2.get("syllabus_alignment_score", 0),
-            layer3.get("completeness_score", 0),
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        
+        syllabus_alignment = layer2.syllabus_alignment_score
+        completeness = layer3.completeness_score
+        
+        # Overall confidence: mean of layer 1 confidence, alignment and completeness
+        overall_confidence = (layer1.confidence * 100 + syllabus_alignment + completeness) / 3
+        
+        # Build warnings list (copied so layer 1's result isn't mutated)
+        warnings = list(layer1.warnings)
+        missing_concepts = layer2.missing_cbse_concepts
+        if missing_concepts:
+            warnings.append(f"Missing CBSE concepts: {len(missing_concepts)} items")
+        factual_issues = layer3.factual_issues
+        if factual_issues:
+            warnings.append(f"Potential factual issues: {len(factual_issues)} items")
+        
+        # Transform generated questions
+        important_questions = [
+            {
+                "question": q.question,
+                "answer": q.answer,
+                "marks": q.marks,
+                "type": q.type,
+            }
+            for q in layer4.important_questions
         ]
         
-        # Weight factors
-        overall_confidence = sum(confidence_factors) / len(confidence_factors) if confidence_factors else 0
-        
-        # Determine verification status
-        verification_status = layer2.get("verification_status", "needs_review")
-        
-        # Build warnings list
-        warnings = layer1.get("warnings", [])
-        if layer2.get("missing_cbse_concepts"):
-            warnings.append(f"Missing CBSE concepts: {len(layer2['missing_cbse_concepts'])} items")
-        if layer3.get("factual_issues"):
-            warnings.append(f"Potential factual issues: {len(layer3['factual_issues'])} items")
-        
-        # Transform board questions
+        # One pass over web questions: the top 10 are listed as board questions
+        # and the top 5 with text are also added to the important questions
         board_questions = []
-        for q in layer4.get("important_questions", []):
+        for index, q in enumerate(web_board_questions[:10]):
+            q_get = q.get
             board_questions.append({
-                "question": q.get("question", ""),
-                "answer": q.get("answer", ""),
-                "marks": q.get("marks", 4),
-                "type": q.get("type", "short"),
+                "year": q_get("year", "Various"),
+                "question": q_get("question", ""),
+                "marks": q_get("marks", 4),
             })
-        
-        # Add web-found questions to board questions list
-        for q in web_board_questions[:5]:
-            if q.get("question"):
-                board_questions.append({
+            if index < 5 and q_get("question"):
+                marks = q_get("marks") or 4
+                important_questions.append({
                     "question": q["question"],
                     "answer": "(Found via web search - verify with official sources)",
-                    "marks": q.get("marks") or 4,
-                    "type": "short" if (q.get("marks") or 4) <= 3 else "long",
+                    "marks": marks,
+                    "type": "short" if marks <= 3 else "long",
                 })
         
-        # Transform subtopics
-        subtopics = []
-        for st in layer1.get("subtopics", []):
-            subtopics.append({
-                "title": st.get("title", ""),
-                "description": st.get("description", ""),
-                "key_points": st.get("key_points", []),
-            })
-        
         return {
             "chapter_name": chapter_name,
             "subject": subject,
-            "subtopics": subtopics,
-            "important_questions": board_questions[:15],  # Limit to 15
-            "board_questions": [
+            "subtopics": [
                 {
-                    "year": q.get("year", "Various"),
-                    "question": q.get("question", ""),
-                    "marks": q.get("marks", 4),
+                    "title": st.title,
+                    "description": st.description,
+                    "key_points": st.key_points,
                 }
-                for q in web_board_questions[:10]
+                for st in layer1.subtopics
             ],
-            "quick_notes": layer1.get("quick_notes", []),
-            "mnemonics": layer1.get("mnemonics", []),
+            "important_questions": important_questions[:15],  # Limit to 15
+            "board_questions": board_questions,
+            "quick_notes": layer1.quick_notes,
+            "mnemonics": layer1.mnemonics,
             "sources": [
-                {"title": s.get("title"), "link": s.get("link"), "source": s.get("source")}
+                {"title": s.title, "link": s.link, "source": s.source}
                 for s in sources[:10]
             ],
             "verification": {
-                "status": verification_status,
+                "status": layer2.verification_status,
                 "confidence_score": round(overall_confidence, 1),
-                "syllabus_alignment": layer2.get("syllabus_alignment_score", 0),
-                "completeness": layer3.get("completeness_score", 0),
-                "question_authenticity": layer4.get("question_authenticity_score", 0),
+                "syllabus_alignment": syllabus_alignment,
+                "completeness": completeness,
+                "question_authenticity": layer4.question_authenticity_score,
             },
             "warnings": warnings if warnings else None,
             "processing_time_ms": processing_time,
-            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
         }
 
 
@@ -0,0 +1,100 @@
+"""
+Response cache for LLM JSON generations (in-process TTL cache + optional Redis).
+"""
+import hashlib
+import re
+from typing import Any
+import orjson
+from cachetools import TTLCache
+from src.redis_client import get_redis
+
+# Bump when prompts, key normalization or the parsed response shape change
+LLM_CACHE_VERSION = "v2"
+LLM_CACHE_MAXSIZE = 1024
+LLM_CACHE_TTL_SECONDS = 60 * 60
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class LLMCache:
+    """
+    Exact-match cache for LLM JSON responses.
+    
+    Keys hash the whitespace-normalized prompt together with the system
+    message and temperature. Entries live in an in-process TTL cache
+    and, when Redis is configured, in Redis so all workers share them.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = LLM_CACHE_MAXSIZE,
+        ttl: int = LLM_CACHE_TTL_SECONDS,
+    ):
+        self.ttl = ttl
+        self._memory: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+    
+    @staticmethod
+    def make_key(prompt: str, system_message: str | None, temperature: float) -> str:
+        """Build the cache key for a generation request."""
+        normalized = _WHITESPACE_RE.sub(" ", prompt).strip()
+        digest = hashlib.sha256(
+            f"{system_message or ''}\x00{normalized}\x00{temperature}".encode()
+        ).hexdigest()
+        return f"{LLM_CACHE_VERSION}:llm:{digest}"
+    
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Look up a cached response; Redis failures count as a miss."""
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached
+        
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(key)
+        except Exception as e:
+            print(f"⚠️  LLM cache read failed: {str(e)}")
+            return None
+        if not raw:
+            return None
+        
+        cached = orjson.loads(raw)
+        self._memory[key] = cached
+        return cached
+    
+    async def set(self, key: str, value: dict[str, Any]):
+        """Store a response in both tiers; Redis writes are best-effort."""
+        self._memory[key] = value
+        
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.setex(key, self.ttl, orjson.dumps(value))
+        except Exception as e:
+            print(f"⚠️  LLM cache write failed: {str(e)}")
+    
+    async def delete(self, key: str):
+        """Evict a response from both tiers; Redis deletes are best-effort."""
+        self._memory.pop(key, None)
+        
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(key)
+        except Exception as e:
+            print(f"⚠️  LLM cache delete failed: {str(e)}")
+
+
+# Singleton instance
+_llm_cache: LLMCache | None = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Get or create LLM cache instance."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
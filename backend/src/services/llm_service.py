@@ -1,23 +1,155 @@
 """
 LLM Service with Gemini Primary + Groq Fallback.
 """
-import json
 import asyncio
+import statistics
+import time
+from collections import deque
+from functools import lru_cache
 from typing import Any
 import httpx
+import msgspec
+import orjson
+from aiolimiter import AsyncLimiter
 from src.config import get_settings
+from src.http_client import RETRYABLE_STATUS_CODES, get_http_client, send_with_retry
 
 settings = get_settings()
 
+# Rate limits are tracked per API key: the server's own keys are shared by every
+# request, while a bring-your-own key only throttles its owner. Buckets live in
+# each worker process, so each worker enforces an equal share of the limits.
+MAX_TRACKED_API_KEYS = 1024
+
+
+def _new_rate_limiters(provider: str) -> tuple[AsyncLimiter, AsyncLimiter]:
+    """Fresh (requests, tokens) per-minute buckets holding this worker's share of a key's limits."""
+    if provider == "gemini":
+        rpm, tpm = settings.gemini_max_requests_per_minute, settings.gemini_max_tokens_per_minute
+    else:
+        rpm, tpm = settings.groq_max_requests_per_minute, settings.groq_max_tokens_per_minute
+    workers = max(1, settings.web_concurrency)
+    return AsyncLimiter(max(1, rpm // workers), 60), AsyncLimiter(max(1, tpm // workers), 60)
+
+
+# The server keys' buckets are never evicted, so their budget can't be reset
+_server_rate_limiters = {
+    ("gemini", settings.gemini_api_key): _new_rate_limiters("gemini"),
+    ("groq", settings.groq_api_key): _new_rate_limiters("groq"),
+}
+
+
+@lru_cache(maxsize=MAX_TRACKED_API_KEYS)
+def _user_rate_limiters(provider: str, api_key: str) -> tuple[AsyncLimiter, AsyncLimiter]:
+    """Buckets for a bring-your-own key (least recently used keys are dropped)."""
+    return _new_rate_limiters(provider)
+
+
+def _rate_limiters(provider: str, api_key: str) -> tuple[AsyncLimiter, AsyncLimiter]:
+    """(requests, tokens) per-minute buckets for one provider API key."""
+    limiters = _server_rate_limiters.get((provider, api_key))
+    return limiters if limiters is not None else _user_rate_limiters(provider, api_key)
+
+
+# Caps in-flight generations process-wide, whichever keys they use; the limiters above cap the rate
+_generation_semaphore = asyncio.Semaphore(settings.max_concurrent_llm)
+
+
+def _estimate_tokens(prompt_chars: int, max_tokens: int) -> int:
+    """A call's estimated tokens: ~4 chars/token prompt + the completion budget."""
+    return prompt_chars // 4 + max_tokens
+
+
+async def _reserve_tokens(limiter: AsyncLimiter, prompt_chars: int, max_tokens: int):
+    """Deduct a call's estimated tokens from a TPM bucket, waiting for room."""
+    await limiter.acquire(min(_estimate_tokens(prompt_chars, max_tokens), limiter.max_rate))
+
+
+async def _charge_completion(limiter: AsyncLimiter, completion_tokens: int):
+    """
+    Deduct a finished hedge's completion tokens from a TPM bucket without waiting.
+    
+    If the bucket can't take them the charge is skipped rather than delaying an
+    answer that is already here; the provider's own 429s bound any overshoot.
+    """
+    amount = min(completion_tokens, limiter.max_rate)
+    if limiter.has_capacity(amount):
+        await limiter.acquire(amount)
+
+
+# Hedge delay: the primary's rolling P95 latency, once enough calls have been seen
+HEDGE_LATENCY_SAMPLE_SIZE = 100
+HEDGE_MIN_LATENCY_SAMPLES = 20
+_latencies: dict[str, deque] = {}
+
+
+def _record_latency(provider: str, seconds: float):
+    """Add a successful call's latency sample for a provider."""
+    _latencies.setdefault(provider, deque(maxlen=HEDGE_LATENCY_SAMPLE_SIZE)).append(seconds)
+
+
+def _hedge_delay(provider: str) -> float:
+    """Seconds to wait on `provider` before hedging: its P95 latency, or the configured default."""
+    samples = _latencies.get(provider)
+    if not samples or len(samples) < HEDGE_MIN_LATENCY_SAMPLES:
+        return settings.llm_hedge_delay_ms / 1000
+    return statistics.quantiles(samples, n=20)[-1]
+
+
+class LLMOutputError(Exception):
+    """The provider answered, but the content was cut off at max_tokens or isn't valid JSON."""
+
+
+class LLMTransientError(Exception):
+    """The provider was rate-limited, timed out or returned a 5xx; a later retry may succeed."""
+
+
+# Provider failures that are worth waiting out before trying again
+TRANSIENT_ERRORS = (LLMTransientError, httpx.TransportError)
+
+
+def _parse_content(
+    content: str | dict[str, Any],
+    decoder: msgspec.json.Decoder | None = None,
+    truncated: bool = False,
+) -> Any:
+    """
+    Parse the model's JSON text, skipping the parse if it already arrived as an object.
+    
+    With a decoder, the content is decoded straight into the decoder's typed result.
+    Content that fails to parse raises LLMOutputError.
+    """
+    try:
+        if decoder is None:
+            return content if isinstance(content, dict) else orjson.loads(content)
+        if isinstance(content, dict):
+            return msgspec.convert(content, decoder.type, strict=False)
+        return decoder.decode(content)
+    except (orjson.JSONDecodeError, msgspec.DecodeError) as e:
+        reason = "was truncated at max_tokens" if truncated else "is not valid JSON"
+        raise LLMOutputError(f"Response content {reason}: {str(e)}") from e
+
+
+def _error_message(response: httpx.Response) -> str:
+    """Extract the provider's error message, falling back to the raw body."""
+    try:
+        return orjson.loads(response.content)["error"]["message"]
+    except Exception:
+        return response.text
+
 
 class LLMService:
     """
     Service for LLM operations with Gemini primary and Groq fallback.
     
     Flow:
-    1. Try Gemini first (Google's model)
-    2. If Gemini fails (rate limit, error, etc.), fall back to Groq (Llama 3)
-    3. If both fail, raise exception
+    1. Start Gemini first (Google's model)
+    2. If Gemini fails, start Groq (Llama 3). If Gemini is merely slow (past its
+       P95 latency) and Groq's rate-limit buckets have room, start Groq as a hedge
+    3. Return whichever succeeds first and cancel the other
+    4. If both fail, raise exception (LLMOutputError if any provider answered
+       with truncated or undecodable content, LLMTransientError if every
+       provider failure was transient)
     """
     
     def __init__(self):
@@ -46,27 +178,102 @@ class LLMService:
         Returns:
             Parsed JSON response
         """
-        errors = []
+        result, _ = await self.generate_json_with_usage(
+            prompt, system_message, temperature, max_tokens
+        )
+        return result
+    
+    async def generate_json_with_usage(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        temperature: float = 0.3,
+        max_tokens: int = 2000,
+        decoder: msgspec.json.Decoder | None = None,
+    ) -> tuple[Any, int | None]:
+        """
+        Same as generate_json, but also returns the completion token count
+        reported by the provider (None if the response carried no usage data).
         
-        # Try Gemini first (Primary)
-        if self.gemini_api_key:
-            try:
-                result = await self._call_gemini(prompt, system_message, temperature, max_tokens)
-                return result
-            except Exception as e:
-                errors.append(f"Gemini failed: {str(e)}")
-                # Continue to fallback
-        
-        # Fallback to Groq
-        if self.groq_api_key:
+        If a msgspec decoder is given, the content is decoded into its type
+        instead of a dict (a msgspec error counts as a provider failure).
+        """
+        async with _generation_semaphore:
+            errors = []
+            output_error = False
+            transient = True
+            args = (prompt, system_message, temperature, max_tokens, decoder)
+            
+            # Gemini is primary, Groq is the hedge/fallback
+            providers = []
+            if self.gemini_api_key:
+                providers.append(("Gemini", self._call_gemini))
+            if self.groq_api_key:
+                providers.append(("Groq", self._call_groq))
+            
+            hedge_delay = _hedge_delay(providers[0][0]) if providers else 0
+            names: dict[asyncio.Task, str] = {}
+            started: dict[asyncio.Task, float] = {}
+            pending: set[asyncio.Task] = set()
             try:
-                result = await self._call_groq(prompt, system_message, temperature, max_tokens)
-                return result
-            except Exception as e:
-                errors.append(f"Groq failed: {str(e)}")
+                for index, (name, call) in enumerate(providers):
+                    # Started while an earlier provider is still running: a hedge
+                    task = asyncio.create_task(call(*args, hedge=bool(pending)))
+                    names[task] = name
+                    started[task] = time.perf_counter()
+                    pending.add(task)
+                    can_hedge = index < len(providers) - 1
+                    
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending,
+                            timeout=hedge_delay if can_hedge else None,
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                        if not done:
+                            # Slow, not failed: hedge only if the next provider has quota
+                            # to spare, otherwise keep it for a real failover
+                            next_name = providers[index + 1][0]
+                            if self._has_capacity(next_name, prompt, system_message, max_tokens):
+                                break
+                            can_hedge = False
+                            continue
+                        for finished in done:
+                            if finished.exception() is None:
+                                _record_latency(names[finished], time.perf_counter() - started[finished])
+                                return finished.result()
+                            errors.append(f"{names[finished]} failed: {str(finished.exception())}")
+                            output_error |= isinstance(finished.exception(), LLMOutputError)
+                            transient &= isinstance(finished.exception(), TRANSIENT_ERRORS)
+            finally:
+                for task in names:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        task.exception()  # Mark as retrieved
         
         # Both failed
-        raise Exception(f"All LLM providers failed. Errors: {'; '.join(errors)}")
+        message = f"All LLM providers failed. Errors: {'; '.join(errors)}"
+        if output_error:
+            raise LLMOutputError(message)
+        if transient and errors:
+            raise LLMTransientError(message)
+        raise Exception(message)
+    
+    def _has_capacity(
+        self,
+        name: str,
+        prompt: str,
+        system_message: str | None,
+        max_tokens: int,
+    ) -> bool:
+        """Whether a provider's rate-limit buckets could take this call right now."""
+        api_key = self.gemini_api_key if name == "Gemini" else self.groq_api_key
+        request_limiter, token_limiter = _rate_limiters(name.lower(), api_key)
+        estimate = _estimate_tokens(len(prompt) + len(system_message or ""), max_tokens)
+        return request_limiter.has_capacity() and token_limiter.has_capacity(
+            min(estimate, token_limiter.max_rate)
+        )
     
     async def _call_gemini(
         self,
@@ -74,8 +281,16 @@ class LLMService:
         system_message: str | None,
         temperature: float,
         max_tokens: int,
-    ) -> dict[str, Any]:
-        """Call Google Gemini API."""
+        decoder: msgspec.json.Decoder | None = None,
+        hedge: bool = False,
+    ) -> tuple[Any, int | None]:
+        """
+        Call Google Gemini API.
+        
+        A hedge reserves only its prompt tokens up front and is charged its
+        completion tokens once it finishes, so a cancelled hedge costs no
+        completion budget.
+        """
         # Combine system message with prompt if provided
         full_prompt = prompt
         if system_message:
@@ -84,33 +299,46 @@ class LLMService:
         # Add JSON instruction
         full_prompt += "\n\nRespond ONLY with valid JSON."
         
-        async with httpx.AsyncClient(timeout=settings.max_llm_timeout) as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent?key={self.gemini_api_key}",
-                headers={"Content-Type": "application/json"},
-                json={
-                    "contents": [{"parts": [{"text": full_prompt}]}],
-                    "generationConfig": {
-                        "temperature": temperature,
-                        "maxOutputTokens": max_tokens,
-                        "responseMimeType": "application/json",
+        request_limiter, token_limiter = _rate_limiters("gemini", self.gemini_api_key)
+        await _reserve_tokens(token_limiter, len(full_prompt), 0 if hedge else max_tokens)
+        
+        async def send():
+            async with request_limiter:
+                return await get_http_client().post(
+                    f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent?key={self.gemini_api_key}",
+                    headers={"Content-Type": "application/json"},
+                    json={
+                        "contents": [{"parts": [{"text": full_prompt}]}],
+                        "generationConfig": {
+                            "temperature": temperature,
+                            "maxOutputTokens": max_tokens,
+                            "responseMimeType": "application/json",
+                        },
                     },
-                },
-            )
-            
-            if response.status_code != 200:
-                error_data = response.json() if response.text else {}
-                error_msg = error_data.get("error", {}).get("message", response.text)
-                raise Exception(f"Gemini API error ({response.status_code}): {error_msg}")
-            
-            data = response.json()
-            
-            # Check for blocked content
-            if "candidates" not in data or not data["candidates"]:
-                raise Exception("Gemini returned no candidates (content may be blocked)")
-            
-            content = data["candidates"][0]["content"]["parts"][0]["text"]
-            return json.loads(content)
+                )
+        
+        # Retry transient 429/5xx on Gemini itself rather than burning the Groq fallback
+        response = await send_with_retry(send)
+        
+        if response.status_code != 200:
+            error_msg = _error_message(response)
+            error = LLMTransientError if response.status_code in RETRYABLE_STATUS_CODES else Exception
+            raise error(f"Gemini API error ({response.status_code}): {error_msg}")
+        
+        # Parse the envelope once from the raw body
+        data = orjson.loads(response.content)
+        
+        # Check for blocked content
+        if "candidates" not in data or not data["candidates"]:
+            raise Exception("Gemini returned no candidates (content may be blocked)")
+        
+        candidate = data["candidates"][0]
+        content = candidate["content"]["parts"][0]["text"]
+        completion_tokens = data.get("usageMetadata", {}).get("candidatesTokenCount")
+        if hedge:
+            await _charge_completion(token_limiter, completion_tokens or max_tokens)
+        truncated = candidate.get("finishReason") == "MAX_TOKENS"
+        return _parse_content(content, decoder, truncated), completion_tokens
     
     async def _call_groq(
         self,
@@ -118,37 +346,53 @@ class LLMService:
         system_message: str | None,
         temperature: float,
         max_tokens: int,
-    ) -> dict[str, Any]:
-        """Call Groq API (Llama 3)."""
+        decoder: msgspec.json.Decoder | None = None,
+        hedge: bool = False,
+    ) -> tuple[Any, int | None]:
+        """Call Groq API (Llama 3). Hedges are charged as in _call_gemini."""
         messages = []
         if system_message:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": prompt + "\n\nRespond ONLY with valid JSON."})
         
-        async with httpx.AsyncClient(timeout=settings.max_llm_timeout) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.groq_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                    "response_format": {"type": "json_object"},
-                },
-            )
-            
-            if response.status_code != 200:
-                error_data = response.json() if response.text else {}
-                error_msg = error_data.get("error", {}).get("message", response.text)
-                raise Exception(f"Groq API error ({response.status_code}): {error_msg}")
-            
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            return json.loads(content)
+        request_limiter, token_limiter = _rate_limiters("groq", self.groq_api_key)
+        await _reserve_tokens(
+            token_limiter, len(prompt) + len(system_message or ""), 0 if hedge else max_tokens
+        )
+        
+        async def send():
+            async with request_limiter:
+                return await get_http_client().post(
+                    "https://api.groq.com/openai/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.groq_api_key}",
+                        "Content-Type": "application/json",
+                    },
+                    json={
+                        "model": "llama-3.3-70b-versatile",
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "response_format": {"type": "json_object"},
+                    },
+                )
+        
+        response = await send_with_retry(send)
+        
+        if response.status_code != 200:
+            error_msg = _error_message(response)
+            error = LLMTransientError if response.status_code in RETRYABLE_STATUS_CODES else Exception
+            raise error(f"Groq API error ({response.status_code}): {error_msg}")
+        
+        # Parse the envelope once from the raw body
+        data = orjson.loads(response.content)
+        choice = data["choices"][0]
+        content = choice["message"]["content"]
+        completion_tokens = data.get("usage", {}).get("completion_tokens")
+        if hedge:
+            await _charge_completion(token_limiter, completion_tokens or max_tokens)
+        truncated = choice.get("finish_reason") == "length"
+        return _parse_content(content, decoder, truncated), completion_tokens
 
 
 # Singleton instance
@@ -2,10 +2,16 @@
 4-Layer Synchronous Verification Pipeline for CBSE Commerce answers.
 """
 import asyncio
+import random
+import re
 import time
-from typing import Any
+from functools import lru_cache
+from string import Template
+from typing import Any, TypeVar
+from pydantic import BaseModel, ValidationError
 from src.config import get_settings
-from src.services.llm_service import get_llm_service
+from src.services.llm_cache import get_llm_cache
+from src.services.llm_service import LLMTransientError, get_llm_service
 from src.models.schemas import (
     Layer1Output,
     Layer2Output,
@@ -15,6 +21,24 @@ from src.models.schemas import (
 
 settings = get_settings()
 
+LayerOutput = TypeVar("LayerOutput", bound=BaseModel)
+
+# A chapter counts as well covered once one of its answers scored at least this much
+WELL_COVERED_MIN_SCORE = 90
+
+# Layer 1 samples a little hotter on each retry so a rejected answer isn't regenerated verbatim
+LAYER1_TEMPERATURE = 0.4
+LAYER1_RETRY_TEMPERATURE_STEP = 0.1
+
+# Marks for scorer outputs the pipeline derives itself: taken from the question
+# ("... (4 marks)") when it states them, else the typical CBSE long answer
+_MARKS_RE = re.compile(r"(\d+)\s*marks?\b", re.IGNORECASE)
+DEFAULT_MAX_MARKS = 5
+
+# Full-jitter exponential backoff after a provider error
+RETRY_BACKOFF_BASE_SECONDS = 0.1
+RETRY_BACKOFF_MAX_SECONDS = 2.0
+
 
 # System prompts for each layer
 LAYER1_SYSTEM_PROMPT = """You are an expert CBSE Class 12 Commerce teacher with 20+ years of experience. 
@@ -53,17 +77,147 @@ Respond in JSON format with these fields:
 - missing_components: Array of components that would improve the score"""
 
 
+# User prompt templates for each layer, compiled once at import
+LAYER1_PROMPT_TEMPLATE = Template("""${context}
+
+Question: ${question}
+
+Generate a comprehensive answer following CBSE Class 12 standards. 
+Include definitions, examples, and proper formatting.
+
+Respond with JSON containing: answer, key_points, referenced_concepts, confidence""")
+
+LAYER2_PROMPT_TEMPLATE = Template("""${context}
+
+Question: ${question}
+
+Answer to evaluate:
+${answer}
+
+Evaluate this answer against CBSE syllabus requirements. Identify missing keywords and irrelevant points.
+
+Respond with JSON containing: syllabus_alignment, missing_keywords, irrelevant_points, alignment_score""")
+
+LAYER3_PROMPT_TEMPLATE = Template("""${context}
+
+Question: ${question}
+
+Answer to audit:
+${answer}
+
+Check for logical errors, inconsistencies, or factual inaccuracies in this answer.
+
+Respond with JSON containing: logical_errors, severity""")
+
+LAYER4_PROMPT_TEMPLATE = Template("""${context}
+
+Question: ${question}
+
+Answer to score:
+${answer}
+
+Evaluate this answer using CBSE marking scheme. Provide detailed scoring breakdown.
+
+Respond with JSON containing: predicted_score, max_marks, score_percentage, missing_components""")
+
+
 class VerificationPipeline:
     """
     4-Layer synchronous verification pipeline for generating high-quality CBSE answers.
     
-    Flow: Generator → Validator → Auditor → Scorer
+    Flow: Generator → (Validator, Auditor, Scorer concurrently)
     With max 2 retries if any layer fails quality thresholds.
+    
+    Fast path: a very confident layer 1 answer on a chapter whose past answers
+    scored well skips layers 2-4 and reports outputs derived from its confidence.
     """
     
     def __init__(self):
         self.llm = get_llm_service()
+        self.cache = get_llm_cache()
         self.max_retries = settings.max_retries
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        # (subject, chapter) pairs with a past answer scoring >= WELL_COVERED_MIN_SCORE
+        self._well_covered: set[tuple[str, str]] = set()
+    
+    async def _generate(
+        self,
+        prompt: str,
+        system_message: str,
+        temperature: float,
+        output_model: type[LayerOutput],
+        use_cache: bool = True,
+        store: bool = True,
+    ) -> LayerOutput:
+        """
+        generate_json through the response cache, validated as `output_model`.
+        
+        Only responses that validate are cached; a cached entry that no longer
+        validates is treated as a miss. Identical concurrent calls share one
+        provider request, which is cancelled once every caller has been cancelled.
+        
+        use_cache=False skips the lookup to force a fresh generation (retries of
+        layers 2-4). store=False keeps the response out of the cache: layer 1
+        retries run at a raised temperature, so process() caches the answer
+        itself under the first attempt's key once it passes the thresholds.
+        """
+        key = self.cache.make_key(prompt, system_message, temperature)
+        if use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                try:
+                    return output_model.model_validate(cached)
+                except ValidationError:
+                    pass  # Stale entry - regenerate and overwrite it
+        
+        task = self._inflight.get(key)
+        if task is None or task.cancelled():
+            task = asyncio.create_task(self._generate_and_store(
+                key, prompt, system_message, temperature, output_model, store
+            ))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # Shielded so one caller giving up doesn't cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # Unpublish before cancelling so a caller arriving now starts a fresh call
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()  # No-op once finished; otherwise nobody needs the result
+    
+    def _finish_inflight(self, key: str, task: asyncio.Task):
+        """Drop a finished call from the in-flight map."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter went away
+    
+    async def _generate_and_store(
+        self,
+        key: str,
+        prompt: str,
+        system_message: str,
+        temperature: float,
+        output_model: type[LayerOutput],
+        store: bool = True,
+    ) -> LayerOutput:
+        """Call the LLM, validate the response and only then (if `store`) cache it under `key`."""
+        raw = await self.llm.generate_json(
+            prompt=prompt,
+            system_message=system_message,
+            temperature=temperature,
+        )
+        result = output_model.model_validate(raw)
+        if store:
+            await self.cache.set(key, result.model_dump(mode="json"))
+        return result
     
     async def process(
         self,
@@ -82,165 +236,297 @@ class VerificationPipeline:
         Returns:
             Dictionary with all layer outputs and final answer
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         retries = 0
+        result: dict[str, Any] | None = None
         
         # Build context
         context = f"Subject: {subject}"
         if chapter:
             context += f", Chapter: {chapter}"
         
-        while retries <= self.max_retries:
-            try:
-                # ===== LAYER 1: Generator =====
-                layer1_prompt = self._build_layer1_prompt(question, context)
-                layer1_raw = await self.llm.generate_json(
-                    prompt=layer1_prompt,
-                    system_message=LAYER1_SYSTEM_PROMPT,
-                    temperature=0.4,
-                )
-                layer1 = Layer1Output(**layer1_raw)
-                
-                # If confidence is too low on first try, retry immediately
-                if layer1.confidence < 0.6 and retries == 0:
-                    retries += 1
-                    continue
-                
-                # ===== LAYER 2: Validator =====
-                layer2_prompt = self._build_layer2_prompt(question, layer1.answer, context)
-                layer2_raw = await self.llm.generate_json(
-                    prompt=layer2_prompt,
-                    system_message=LAYER2_SYSTEM_PROMPT,
-                    temperature=0.3,
-                )
-                layer2 = Layer2Output(**layer2_raw)
-                
-                # Check alignment threshold
-                if layer2.alignment_score < 75:
-                    if retries < self.max_retries:
-                        retries += 1
-                        continue
-                
-                # ===== LAYER 3: Auditor =====
-                layer3_prompt = self._build_layer3_prompt(question, layer1.answer, context)
-                layer3_raw = await self.llm.generate_json(
-                    prompt=layer3_prompt,
-                    system_message=LAYER3_SYSTEM_PROMPT,
-                    temperature=0.3,
-                )
-                layer3 = Layer3Output(**layer3_raw)
-                
-                # Check severity - high severity triggers retry
-                if layer3.severity == "high":
-                    if retries < self.max_retries:
-                        retries += 1
-                        continue
-                
-                # ===== LAYER 4: Scorer =====
-                layer4_prompt = self._build_layer4_prompt(question, layer1.answer, context)
-                layer4_raw = await self.llm.generate_json(
-                    prompt=layer4_prompt,
-                    system_message=LAYER4_SYSTEM_PROMPT,
-                    temperature=0.2,
-                )
-                layer4 = Layer4Output(**layer4_raw)
-                
-                # Check score threshold
-                if layer4.score_percentage < 75:
-                    if retries < self.max_retries:
+        layer1_prompt = self._build_layer1_prompt(question, context)
+        # The question's cached answer lives under the first attempt's key
+        layer1_key = self.cache.make_key(
+            layer1_prompt, LAYER1_SYSTEM_PROMPT, self._layer1_temperature(0)
+        )
+        
+        speculative_layer1: asyncio.Task | None = None
+        try:
+            while retries <= self.max_retries:
+                try:
+                    # ===== LAYER 1: Generator =====
+                    if speculative_layer1 is not None:
+                        # Replacement answer generated alongside the last attempt's layers 2-4
+                        task, speculative_layer1 = speculative_layer1, None
+                        layer1 = await task
+                    else:
+                        layer1 = await self._generate(
+                            layer1_prompt,
+                            LAYER1_SYSTEM_PROMPT,
+                            self._layer1_temperature(retries),
+                            Layer1Output,
+                            use_cache=retries == 0,
+                            store=retries == 0,
+                        )
+                    
+                    # If confidence is too low on first try, retry immediately
+                    if layer1.confidence < 0.6 and retries == 0:
+                        await self.cache.delete(layer1_key)
                         retries += 1
                         continue
+                    
+                    fast_path = (
+                        chapter is not None
+                        and layer1.confidence >= settings.fast_path_confidence_threshold
+                        and (subject, chapter) in self._well_covered
+                    )
+                    
+                    # A middling answer often fails validation - start generating its
+                    # replacement now (at the retry's temperature) so a retry doesn't wait for it
+                    if not fast_path and layer1.confidence < 0.8 and retries < self.max_retries:
+                        # Goes through _generate like any retry (coalesced, validated, not
+                        # stored); the answer is cached below if it passes
+                        speculative_layer1 = asyncio.create_task(self._generate(
+                            layer1_prompt,
+                            LAYER1_SYSTEM_PROMPT,
+                            self._layer1_temperature(retries + 1),
+                            Layer1Output,
+                            use_cache=False,
+                            store=False,
+                        ))
+                    
+                    # ===== LAYERS 2-4: Validator, Auditor, Scorer =====
+                    if fast_path:
+                        layer2, layer3, layer4 = self._fast_path_layers(question, layer1)
+                        passed = True
+                    else:
+                        layer2, layer3, layer4 = await self._run_layers_2_to_4(
+                            question,
+                            layer1.answer,
+                            context,
+                            use_cache=retries == 0,
+                            stop_on_high_severity=retries < self.max_retries,
+                        )
+                        
+                        # Check thresholds: low alignment, high-severity errors or a low
+                        # predicted score retry the whole attempt while retries remain
+                        # (a layer left as None was cut short by a high-severity audit)
+                        passed = (
+                            None not in (layer2, layer3, layer4)
+                            and layer2.alignment_score >= 75
+                            and layer3.severity != "high"
+                            and layer4.score_percentage >= 75
+                        )
+                        if not passed:
+                            # Don't serve a rejected answer to the next asker
+                            await self.cache.delete(layer1_key)
+                            if retries < self.max_retries:
+                                retries += 1
+                                continue
+                        
+                        # Remember chapters that produce high-scoring answers for the fast path
+                        if (
+                            passed
+                            and chapter
+                            and not layer4.derived
+                            and layer4.score_percentage >= WELL_COVERED_MIN_SCORE
+                        ):
+                            self._well_covered.add((subject, chapter))
+                    
+                    # ===== All layers passed (or retries ran out) =====
+                    if passed and retries:
+                        # Replace the rejected first answer with the one that passed
+                        await self.cache.set(layer1_key, layer1.model_dump(mode="json"))
+                    
+                    # Calculate final confidence score
+                    final_confidence = min(
+                        layer1.confidence * 100,
+                        layer2.alignment_score,
+                        layer4.score_percentage,
+                    )
+                    
+                    # Build final enhanced answer incorporating feedback
+                    final_answer = self._build_final_answer(
+                        layer1, layer2, layer3, layer4
+                    )
+                    
+                    result = {
+                        "layer1_output": layer1.model_dump(mode="json"),
+                        "layer2_output": layer2.model_dump(mode="json"),
+                        "layer3_output": layer3.model_dump(mode="json"),
+                        "layer4_output": layer4.model_dump(mode="json"),
+                        "final_answer": final_answer,
+                        "confidence_score": round(final_confidence, 2),
+                        "referenced_concepts": list(layer1.referenced_concepts),
+                        "retries": retries,
+                        "status": "completed",
+                        "fast_path": fast_path,
+                    }
+                    break
+                    
+                except Exception as e:
+                    if retries >= self.max_retries:
+                        # Max retries reached - return safe failure
+                        result = self._build_failure_response(question, retries, str(e))
+                        break
+                    retries += 1
+                    # Only transient provider errors (429, 5xx, timeouts) are worth
+                    # waiting out; malformed output is retried straight away
+                    if isinstance(e, (LLMTransientError, asyncio.TimeoutError)):
+                        await asyncio.sleep(random.uniform(
+                            0, min(RETRY_BACKOFF_BASE_SECONDS * 2 ** retries, RETRY_BACKOFF_MAX_SECONDS)
+                        ))
+        finally:
+            # An unused replacement answer is no longer needed
+            if speculative_layer1 is not None:
+                if not speculative_layer1.done():
+                    speculative_layer1.cancel()
+                elif not speculative_layer1.cancelled():
+                    speculative_layer1.exception()  # Mark as retrieved
+        
+        if result is None:
+            # Should not reach here, but just in case
+            result = self._build_failure_response(question, retries)
+        
+        result["processing_time_ms"] = (time.perf_counter_ns() - start_ns) // 1_000_000
+        return result
+    
+    def _layer1_temperature(self, retries: int) -> float:
+        """Layer 1 sampling temperature for the given attempt."""
+        return round(LAYER1_TEMPERATURE + LAYER1_RETRY_TEMPERATURE_STEP * retries, 2)
+    
+    async def _run_layers_2_to_4(
+        self,
+        question: str,
+        answer: str,
+        context: str,
+        use_cache: bool,
+        stop_on_high_severity: bool,
+    ) -> tuple[Layer2Output | None, Layer3Output | None, Layer4Output | None]:
+        """
+        Run the validator, auditor and scorer concurrently (they only read the answer).
+        
+        - Alignment >= 95 makes the scorer redundant: it is cancelled and its
+          output derived from layer 2.
+        - A high-severity audit means the attempt will be retried: with
+          stop_on_high_severity the remaining layers are cancelled and the
+          unfinished outputs come back as None.
+        """
+        layer2_task = asyncio.create_task(self._generate(
+            self._build_layer2_prompt(question, answer, context),
+            LAYER2_SYSTEM_PROMPT,
+            0.3,
+            Layer2Output,
+            use_cache=use_cache,
+        ))
+        layer3_task = asyncio.create_task(self._generate(
+            self._build_layer3_prompt(question, answer, context),
+            LAYER3_SYSTEM_PROMPT,
+            0.3,
+            Layer3Output,
+            use_cache=use_cache,
+        ))
+        layer4_task = asyncio.create_task(self._generate(
+            self._build_layer4_prompt(question, answer, context),
+            LAYER4_SYSTEM_PROMPT,
+            0.2,
+            Layer4Output,
+            use_cache=use_cache,
+        ))
+        
+        layer2 = layer3 = layer4 = None
+        pending = {layer2_task, layer3_task, layer4_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
                 
-                # ===== All layers passed =====
-                processing_time = int((time.time() - start_time) * 1000)
-                
-                # Calculate final confidence score
-                final_confidence = min(
-                    layer1.confidence * 100,
-                    layer2.alignment_score,
-                    layer4.score_percentage,
-                )
-                
-                # Build final enhanced answer incorporating feedback
-                final_answer = self._build_final_answer(
-                    layer1, layer2, layer3, layer4
-                )
+                if layer2_task in done:
+                    layer2 = layer2_task.result()
+                    if layer2.alignment_score >= 95 and layer4_task in pending:
+                        pending.discard(layer4_task)
+                        layer4 = self._derive_layer4(question, layer2)
                 
-                return {
-                    "layer1_output": layer1.model_dump(),
-                    "layer2_output": layer2.model_dump(),
-                    "layer3_output": layer3.model_dump(),
-                    "layer4_output": layer4.model_dump(),
-                    "final_answer": final_answer,
-                    "confidence_score": round(final_confidence, 2),
-                    "referenced_concepts": layer1.referenced_concepts,
-                    "retries": retries,
-                    "processing_time_ms": processing_time,
-                    "status": "completed",
-                }
+                if layer3_task in done:
+                    layer3 = layer3_task.result()
+                    if layer3.severity == "high" and stop_on_high_severity:
+                        break
                 
-            except Exception as e:
-                if retries < self.max_retries:
-                    retries += 1
-                    await asyncio.sleep(1)  # Brief pause before retry
-                else:
-                    # Max retries reached - return safe failure
-                    processing_time = int((time.time() - start_time) * 1000)
-                    return self._build_failure_response(question, retries, processing_time, str(e))
+                if layer4_task in done:
+                    layer4 = layer4_task.result()
+        finally:
+            for task in (layer2_task, layer3_task, layer4_task):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark as retrieved
         
-        # Should not reach here, but just in case
-        processing_time = int((time.time() - start_time) * 1000)
-        return self._build_failure_response(question, retries, processing_time)
+        return layer2, layer3, layer4
+    
+    def _fast_path_layers(
+        self,
+        question: str,
+        layer1: Layer1Output,
+    ) -> tuple[Layer2Output, Layer3Output, Layer4Output]:
+        """
+        Stand-in layer 2-4 outputs for a fast-path answer, scored at layer 1's confidence.
+        
+        All three are flagged as derived so stored answers never pass them off
+        as real verification results.
+        """
+        score = round(layer1.confidence * 100, 2)
+        max_marks = self._max_marks(question)
+        return (
+            Layer2Output(
+                syllabus_alignment="Not reviewed (high-confidence answer on a well-covered chapter)",
+                missing_keywords=(),
+                irrelevant_points=(),
+                alignment_score=score,
+                derived=True,
+            ),
+            Layer3Output(logical_errors=(), severity="none", derived=True),
+            Layer4Output(
+                predicted_score=round(max_marks * score / 100, 1),
+                max_marks=max_marks,
+                score_percentage=score,
+                missing_components=(),
+                derived=True,
+            ),
+        )
+    
+    def _max_marks(self, question: str) -> int:
+        """Marks the question is worth, if it says so (else DEFAULT_MAX_MARKS)."""
+        match = _MARKS_RE.search(question)
+        if match and 1 <= int(match.group(1)) <= 100:
+            return int(match.group(1))
+        return DEFAULT_MAX_MARKS
+    
+    def _derive_layer4(self, question: str, layer2: Layer2Output) -> Layer4Output:
+        """Scorer output implied by a near-perfect syllabus alignment (flagged as derived)."""
+        max_marks = self._max_marks(question)
+        return Layer4Output(
+            predicted_score=round(max_marks * layer2.alignment_score / 100, 1),
+            max_marks=max_marks,
+            score_percentage=layer2.alignment_score,
+            missing_components=layer2.missing_keywords,
+            derived=True,
+        )
     
     def _build_layer1_prompt(self, question: str, context: str) -> str:
         """Build prompt for Layer 1 (Generator)."""
-        return f"""{context}
-
-Question: {question}
-
-Generate a comprehensive answer following CBSE Class 12 standards. 
-Include definitions, examples, and proper formatting.
-
-Respond with JSON containing: answer, key_points, referenced_concepts, confidence"""
+        return LAYER1_PROMPT_TEMPLATE.substitute(context=context, question=question)
     
     def _build_layer2_prompt(self, question: str, answer: str, context: str) -> str:
         """Build prompt for Layer 2 (Validator)."""
-        return f"""{context}
-
-Question: {question}
-
-Answer to evaluate:
-{answer}
-
-Evaluate this answer against CBSE syllabus requirements. Identify missing keywords and irrelevant points.
-
-Respond with JSON containing: syllabus_alignment, missing_keywords, irrelevant_points, alignment_score"""
+        return LAYER2_PROMPT_TEMPLATE.substitute(context=context, question=question, answer=answer)
     
     def _build_layer3_prompt(self, question: str, answer: str, context: str) -> str:
         """Build prompt for Layer 3 (Auditor)."""
-        return f"""{context}
-
-Question: {question}
-
-Answer to audit:
-{answer}
-
-Check for logical errors, inconsistencies, or factual inaccuracies in this answer.
-
-Respond with JSON containing: logical_errors, severity"""
+        return LAYER3_PROMPT_TEMPLATE.substitute(context=context, question=question, answer=answer)
     
     def _build_layer4_prompt(self, question: str, answer: str, context: str) -> str:
         """Build prompt for Layer 4 (Scorer)."""
-        return f"""{context}
-
-Question: {question}
-
-Answer to score:
-{answer}
-
-Evaluate this answer using CBSE marking scheme. Provide detailed scoring breakdown.
-
-Respond with JSON containing: predicted_score, max_marks, score_percentage, missing_components"""
+        return LAYER4_PROMPT_TEMPLATE.substitute(context=context, question=question, answer=answer)
     
     def _build_final_answer(
         self,
@@ -250,21 +536,21 @@ Respond with JSON containing: predicted_score, max_marks, score_percentage, miss
         layer4: Layer4Output,
     ) -> str:
         """Build the final enhanced answer incorporating layer feedback."""
-        final = layer1.answer
+        parts = [layer1.answer]
         
         # Add any missing components mentioned by scorer if significant
         if layer4.missing_components and layer4.score_percentage < 90:
-            final += "\n\n---\n**Additional Points for Higher Score:**\n"
-            for component in layer4.missing_components[:3]:  # Max 3 suggestions
-                final += f"- {component}\n"
+            parts.append("\n\n---\n**Additional Points for Higher Score:**\n")
+            parts.extend(
+                f"- {component}\n" for component in layer4.missing_components[:3]  # Max 3 suggestions
+            )
         
-        return final.strip()
+        return "".join(parts).strip()
     
     def _build_failure_response(
         self,
         question: str,
         retries: int,
-        processing_time_ms: int,
         error: str | None = None,
     ) -> dict[str, Any]:
         """Build a safe failure response when max retries are exceeded."""
@@ -306,18 +592,11 @@ If the problem persists, please try again later.""",
             "confidence_score": 0.0,
             "referenced_concepts": [],
             "retries": retries,
-            "processing_time_ms": processing_time_ms,
             "status": "failed",
         }
 
 
-# Singleton instance
-_pipeline: VerificationPipeline | None = None
-
-
+@lru_cache()
 def get_verification_pipeline() -> VerificationPipeline:
-    """Get or create verification pipeline instance."""
-    global _pipeline
-    if _pipeline is None:
-        _pipeline = VerificationPipeline()
-    return _pipeline
+    """Get the shared verification pipeline instance."""
+    return VerificationPipeline()
@@ -2,13 +2,50 @@
 Web Search Service for CBSE Commerce content research.
 Uses SerpAPI for real-time Google search results.
 """
-import httpx
+import re
 import asyncio
+import hashlib
+from functools import lru_cache
 from typing import Any
+import msgspec
+import orjson
+from cachetools import TTLCache
 from src.config import get_settings
+from src.http_client import get_http_client, send_with_retry
+from src.redis_client import get_redis
 
 settings = get_settings()
 
+SEARCH_TIMEOUT_SECONDS = 30
+
+# Caps concurrent SerpAPI calls process-wide
+_search_semaphore = asyncio.Semaphore(settings.max_concurrent_searches)
+
+# Patterns for board-question metadata, compiled once at import
+_YEAR_RE = re.compile(r'20(2[0-5])')
+_MARKS_RE = re.compile(r'(\d+)\s*marks?', re.IGNORECASE)
+_QUESTION_HINT_RE = re.compile(r'\?|question|marks', re.IGNORECASE)
+
+# SerpAPI responses are cached per normalized query (in-process + optional Redis);
+# module-level so every WebSearchService instance shares it
+SEARCH_CACHE_VERSION = "v1"
+SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+_search_cache: TTLCache = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TTL_SECONDS)
+
+
+class SearchSource(msgspec.Struct):
+    """A deduplicated organic search result (slotted, no per-item dict keys)."""
+    title: str
+    link: str
+    snippet: str
+    source: str
+
+
+def _search_cache_key(query: str) -> str:
+    """Build the cache key for a search query."""
+    digest = hashlib.sha256(query.lower().strip().encode()).hexdigest()
+    return f"{SEARCH_CACHE_VERSION}:serp:{digest}"
+
 
 class WebSearchService:
     """
@@ -35,10 +72,10 @@ class WebSearchService:
             query_type: Type of search (general, board_questions, notes, etc.)
             
         Returns:
-            Dictionary with search results
+            Dictionary with search results ("sources" holds SearchSource structs)
         """
-        # Build targeted search queries
-        queries = self._build_queries(subject, chapter_name, query_type)
+        # Build targeted search queries (deduplicated, order kept)
+        queries = list(dict.fromkeys(self._build_queries(subject, chapter_name, query_type)))
         
         # Run searches in parallel
         results = await asyncio.gather(
@@ -56,25 +93,33 @@ class WebSearchService:
             "study_materials": [],
         }
         
-        for i, result in enumerate(results):
+        # Sources are deduplicated by link as they're collected
+        seen_links: set[str] = set()
+        sources: list[SearchSource] = aggregated["sources"]
+        
+        for result in results:
             if isinstance(result, Exception):
                 continue
             
-            query = queries[i]
-            
             # Extract organic results
             organic_results = result.get("organic_results", [])
             for item in organic_results[:5]:  # Top 5 per query
-                source = {
-                    "title": item.get("title", ""),
-                    "link": item.get("link", ""),
-                    "snippet": item.get("snippet", ""),
-                    "source": self._extract_domain(item.get("link", "")),
-                }
-                aggregated["sources"].append(source)
-                
+                # Every result's snippet is kept; only the source list is deduplicated
                 if item.get("snippet"):
                     aggregated["content_snippets"].append(item["snippet"])
+                
+                link = item.get("link", "")
+                if link in seen_links:
+                    continue
+                seen_links.add(link)
+                
+                if len(sources) < 15:  # Keep top 15
+                    sources.append(SearchSource(
+                        item.get("title", ""),
+                        link,
+                        item.get("snippet", ""),
+                        self._extract_domain(link),
+                    ))
             
             # Extract any related questions (People Also Ask)
             related_questions = result.get("related_questions", [])
@@ -84,15 +129,6 @@ class WebSearchService:
                     "source": "people_also_ask",
                 })
         
-        # Deduplicate sources
-        seen_links = set()
-        unique_sources = []
-        for source in aggregated["sources"]:
-            if source["link"] not in seen_links:
-                seen_links.add(source["link"])
-                unique_sources.append(source)
-        aggregated["sources"] = unique_sources[:15]  # Keep top 15
-        
         return aggregated
     
     async def search_board_questions(
@@ -110,11 +146,11 @@ class WebSearchService:
         Returns:
             List of board questions with metadata
         """
-        queries = [
+        queries = list(dict.fromkeys([
             f"CBSE Class 12 {subject} {chapter_name} previous year questions",
             f"CBSE {subject} {chapter_name} board exam questions 2024 2023 2022",
             f"Class 12 {subject} {chapter_name} important questions CBSE",
-        ]
+        ]))
         
         results = await asyncio.gather(
             *[self._execute_search(q) for q in queries],
@@ -129,44 +165,97 @@ class WebSearchService:
             organic = result.get("organic_results", [])
             for item in organic[:10]:
                 title = item.get("title", "")
-                snippet = item.get("snippet", "")
                 
-                # Extract year if present
-                year = self._extract_year(title + " " + snippet)
+                # Skip results whose title doesn't look like a question
+                if not _QUESTION_HINT_RE.search(title):
+                    continue
                 
-                # Check if it looks like a question
-                if "?" in title or "question" in title.lower() or "marks" in title.lower():
-                    questions.append({
-                        "question": title if "?" in title else snippet[:200],
-                        "source": self._extract_domain(item.get("link", "")),
-                        "year": year,
-                        "marks": self._estimate_marks(title + " " + snippet),
-                    })
+                snippet = item.get("snippet", "")
+                text = f"{title} {snippet}"
+                questions.append({
+                    "question": title if "?" in title else snippet[:200],
+                    "source": self._extract_domain(item.get("link", "")),
+                    "year": self._extract_year(text),
+                    "marks": self._estimate_marks(text),
+                })
         
         return questions[:20]  # Return top 20
     
     async def _execute_search(self, query: str) -> dict[str, Any]:
-        """Execute a single search query via SerpAPI."""
+        """Execute a single search query via SerpAPI (cached)."""
         if not self.serpapi_key:
             # Fallback: return empty results if no API key
             return {"organic_results": []}
         
-        async with httpx.AsyncClient(timeout=30) as client:
-            params = {
-                "q": query,
-                "api_key": self.serpapi_key,
-                "engine": "google",
-                "hl": "en",
-                "gl": "in",  # India-specific results
-                "num": 10,
-            }
-            
-            response = await client.get(self.base_url, params=params)
-            
-            if response.status_code != 200:
-                raise Exception(f"SerpAPI error: {response.status_code} - {response.text}")
-            
-            return response.json()
+        key = _search_cache_key(query)
+        cached = _search_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        cached = await self._redis_get(key)
+        if cached is not None:
+            _search_cache[key] = cached
+            return cached
+        
+        params = {
+            "q": query,
+            "api_key": self.serpapi_key,
+            "engine": "google",
+            "hl": "en",
+            "gl": "in",  # India-specific results
+            "num": 10,
+        }
+        
+        async def send():
+            # Shared pooled client; searches keep their own shorter timeout
+            async with _search_semaphore:
+                return await get_http_client().get(
+                    self.base_url, params=params, timeout=SEARCH_TIMEOUT_SECONDS
+                )
+        
+        # Retry transient 429/5xx rather than silently dropping the query
+        response = await send_with_retry(send)
+        
+        if response.status_code != 200:
+            raise Exception(f"SerpAPI error: {response.status_code} - {response.text}")
+        
+        # Keep only what the aggregators read, so cached entries stay small
+        data = orjson.loads(response.content)
+        result = {
+            "organic_results": [
+                {"title": item.get("title", ""), "link": item.get("link", ""), "snippet": item.get("snippet", "")}
+                for item in data.get("organic_results", [])[:10]
+            ],
+            "related_questions": [
+                {"question": q.get("question", "")}
+                for q in data.get("related_questions", [])[:5]
+            ],
+        }
+        _search_cache[key] = result
+        await self._redis_set(key, result)
+        return result
+    
+    async def _redis_get(self, key: str) -> dict[str, Any] | None:
+        """Read a cached search response from Redis; best-effort, any failure counts as a miss."""
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(key)
+            return orjson.loads(raw) if raw else None
+        except Exception as e:
+            print(f"⚠️  Search cache read failed: {str(e)}")
+            return None
+    
+    async def _redis_set(self, key: str, result: dict[str, Any]):
+        """Write a search response to Redis with the cache TTL; best-effort."""
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.setex(key, SEARCH_CACHE_TTL_SECONDS, orjson.dumps(result))
+        except Exception as e:
+            print(f"⚠️  Search cache write failed: {str(e)}")
     
     def _build_queries(
         self,
@@ -199,27 +288,23 @@ class WebSearchService:
         return queries
     
     def _extract_domain(self, url: str) -> str:
-        """Extract domain from URL."""
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            return parsed.netloc.replace("www.", "")
-        except:
-            return "unknown"
+        """Extract domain from URL, without a leading "www."."""
+        host = url.split("://", 1)[-1]
+        for separator in "/?#":
+            host = host.split(separator, 1)[0]
+        return host[4:] if host.startswith("www.") else host
     
     def _extract_year(self, text: str) -> str | None:
         """Extract year from text (2020-2025)."""
-        import re
-        years = re.findall(r'20(2[0-5])', text)
-        if years:
-            return f"20{years[0]}"
+        match = _YEAR_RE.search(text)
+        if match:
+            return f"20{match.group(1)}"
         return None
     
     def _estimate_marks(self, text: str) -> int | None:
         """Estimate marks from text content."""
-        import re
         # Look for patterns like "2 marks", "4 Marks", etc.
-        match = re.search(r'(\d+)\s*marks?', text.lower())
+        match = _MARKS_RE.search(text)
         if match:
             marks = int(match.group(1))
             if marks in [1, 2, 3, 4, 5, 6, 8]:
@@ -227,13 +312,7 @@ class WebSearchService:
         return None
 
 
-# Singleton instance
-_search_service: WebSearchService | None = None
-
-
+@lru_cache()
 def get_web_search_service() -> WebSearchService:
-    """Get or create web search service instance."""
-    global _search_service
-    if _search_service is None:
-        _search_service = WebSearchService()
-    return _search_service
+    """Get the shared web search service instance."""
+    return WebSearchService()
@@ -0,0 +1,62 @@
+"""
+Tests for chapter research max_tokens tuning on LLM failures.
+"""
+import asyncio
+import pytest
+from src.services.chapter_research_service import (
+    LAYER_MAX_TOKENS,
+    ChapterResearchService,
+    Layer2Result,
+)
+from src.services.llm_service import LLMOutputError
+
+
+class FakeLLM:
+    """Fails every call whose max_tokens is below `succeeds_at` with `error`."""
+    
+    def __init__(self, error: Exception, succeeds_at: int):
+        self.error = error
+        self.succeeds_at = succeeds_at
+        self.budgets = []
+    
+    async def generate_json_with_usage(self, max_tokens, decoder, **kwargs):
+        self.budgets.append(max_tokens)
+        if max_tokens < self.succeeds_at:
+            raise self.error
+        return Layer2Result(syllabus_alignment_score=80), None
+
+
+def make_service(llm: FakeLLM, budget: int) -> ChapterResearchService:
+    service = ChapterResearchService()
+    service.llm = llm
+    service._p95_tokens[2] = budget
+    return service
+
+
+def test_truncated_output_is_retried_once_at_full_budget():
+    llm = FakeLLM(LLMOutputError("truncated"), succeeds_at=LAYER_MAX_TOKENS[2])
+    service = make_service(llm, budget=600)
+    
+    result = asyncio.run(service._generate(2, prompt="p", system_message="s", temperature=0.2))
+    assert result.syllabus_alignment_score == 80
+    assert llm.budgets == [600, LAYER_MAX_TOKENS[2]]
+    assert service._p95_tokens[2] == LAYER_MAX_TOKENS[2]
+
+
+def test_truncated_output_at_full_budget_is_not_retried():
+    llm = FakeLLM(LLMOutputError("truncated"), succeeds_at=LAYER_MAX_TOKENS[2] + 1)
+    service = make_service(llm, budget=LAYER_MAX_TOKENS[2])
+    
+    with pytest.raises(LLMOutputError):
+        asyncio.run(service._generate(2, prompt="p", system_message="s", temperature=0.2))
+    assert llm.budgets == [LAYER_MAX_TOKENS[2]]
+
+
+def test_network_errors_keep_the_tuned_budget():
+    llm = FakeLLM(Exception("connection reset"), succeeds_at=LAYER_MAX_TOKENS[2] + 1)
+    service = make_service(llm, budget=600)
+    
+    with pytest.raises(Exception, match="connection reset"):
+        asyncio.run(service._generate(2, prompt="p", system_message="s", temperature=0.2))
+    assert llm.budgets == [600]
+    assert service._p95_tokens[2] == 600
@@ -0,0 +1,87 @@
+"""
+Tests for decoding loose LLM JSON into the chapter research layer results.
+"""
+import orjson
+from src.services.chapter_research_service import LAYER_DECODERS
+
+
+def decode(layer: int, payload: dict):
+    return LAYER_DECODERS[layer].decode(orjson.dumps(payload))
+
+
+def test_layer1_well_formed():
+    result = decode(1, {
+        "chapter_name": "Nature of Management",
+        "subtopics": [{"title": "Concept", "description": "What it is", "key_points": ["a", "b"]}],
+        "quick_notes": ["note"],
+        "mnemonics": ["POSDC"],
+        "confidence": 0.92,
+        "warnings": [],
+    })
+    
+    assert result.subtopics[0].title == "Concept"
+    assert result.subtopics[0].key_points == ["a", "b"]
+    assert result.quick_notes == ["note"]
+    assert result.mnemonics == ["POSDC"]
+    assert result.confidence == 0.92
+
+
+def test_layer1_tolerates_loose_fields():
+    result = decode(1, {
+        "subtopics": [
+            {"title": "Concept", "description": None, "key_points": "single point"},
+            "Bare title",
+        ],
+        "quick_notes": None,
+        "mnemonics": "POSDC - Planning, Organising, Staffing, Directing, Controlling",
+        "confidence": "0.8",
+        "warnings": [{"issue": "No syllabus source"}],
+    })
+    
+    assert result.subtopics[0].description == ""
+    assert result.subtopics[0].key_points == ["single point"]
+    assert result.subtopics[1].title == "Bare title"
+    assert result.quick_notes == []
+    assert result.mnemonics == ["POSDC - Planning, Organising, Staffing, Directing, Controlling"]
+    assert result.confidence == 0.8
+    assert result.warnings == ["No syllabus source"]
+
+
+def test_layer1_missing_fields_use_defaults():
+    result = decode(1, {})
+    
+    assert result.subtopics == []
+    assert result.mnemonics == []
+    assert result.confidence == 0.0
+
+
+def test_layer2_and_3_tolerate_loose_fields():
+    layer2 = decode(2, {
+        "syllabus_alignment_score": "85%",
+        "missing_cbse_concepts": "Span of control",
+        "verification_status": None,
+        "suggested_corrections": {"any": "shape"},
+    })
+    layer3 = decode(3, {"factual_issues": None, "completeness_score": None, "logical_errors": "none"})
+    
+    assert layer2.syllabus_alignment_score == 85
+    assert layer2.missing_cbse_concepts == ["Span of control"]
+    assert layer2.verification_status == "needs_review"
+    assert layer3.factual_issues == []
+    assert layer3.completeness_score == 0
+
+
+def test_layer4_tolerates_loose_fields():
+    result = decode(4, {
+        "important_questions": [
+            {"question": "Define management.", "answer": "...", "marks": None, "type": None},
+            {"question": "Explain POSDC.", "answer": "...", "marks": "6 marks", "type": "long"},
+            "not a question object",
+        ],
+        "question_authenticity_score": 70,
+        "year_wise_distribution": [2023, 2024],
+    })
+    
+    assert [q.marks for q in result.important_questions] == [4, 6]
+    assert [q.type for q in result.important_questions] == ["short", "long"]
+    assert result.question_authenticity_score == 70
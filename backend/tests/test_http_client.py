@@ -0,0 +1,72 @@
+"""
+Tests for retrying transient provider responses.
+"""
+import asyncio
+import httpx
+import pytest
+from src import http_client
+from src.http_client import MAX_BACKOFF_SECONDS, send_with_retry
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting, with the jitter pinned to 0."""
+    recorded = []
+    
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+    
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(http_client.random, "random", lambda: 0.0)
+    return recorded
+
+
+def sender(*responses: httpx.Response):
+    """A `send` callable returning `responses` in order, counting calls."""
+    remaining = list(responses)
+    
+    async def send():
+        send.calls += 1
+        return remaining.pop(0)
+    
+    send.calls = 0
+    return send
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(sleeps):
+    send = sender(httpx.Response(503), httpx.Response(502), httpx.Response(200))
+    
+    response = asyncio.run(send_with_retry(send, max_retries=2))
+    assert response.status_code == 200
+    assert send.calls == 3
+    assert sleeps == [1, 2]
+
+
+def test_exhausted_retries_return_the_last_response(sleeps):
+    send = sender(httpx.Response(429), httpx.Response(429), httpx.Response(429))
+    
+    response = asyncio.run(send_with_retry(send, max_retries=2))
+    assert response.status_code == 429
+    assert send.calls == 3
+    assert sleeps == [1, 2]
+
+
+def test_non_retryable_errors_are_returned_immediately(sleeps):
+    send = sender(httpx.Response(400))
+    
+    assert asyncio.run(send_with_retry(send, max_retries=2)).status_code == 400
+    assert send.calls == 1
+    assert sleeps == []
+
+
+def test_retry_after_is_honoured_and_capped(sleeps):
+    send = sender(
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(429, headers={"Retry-After": "120"}),
+        httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}),
+        httpx.Response(200),
+    )
+    
+    assert asyncio.run(send_with_retry(send, max_retries=3)).status_code == 200
+    # An HTTP-date Retry-After falls back to exponential backoff (2 ** 2)
+    assert sleeps == [3, MAX_BACKOFF_SECONDS, 4]
@@ -0,0 +1,61 @@
+"""
+Tests for the LLM response cache.
+"""
+import asyncio
+from cachetools import TTLCache
+from src.services.llm_cache import LLM_CACHE_VERSION, LLMCache
+
+
+def test_key_normalizes_whitespace_only():
+    key = LLMCache.make_key("What is  GST?\n", "system", 0.3)
+    
+    assert key.startswith(f"{LLM_CACHE_VERSION}:llm:")
+    assert key == LLMCache.make_key("  What is GST? ", "system", 0.3)
+    assert key != LLMCache.make_key("what is gst?", "system", 0.3)
+
+
+def test_key_includes_system_message_and_temperature():
+    key = LLMCache.make_key("prompt", "system", 0.3)
+    
+    assert key != LLMCache.make_key("prompt", "other system", 0.3)
+    assert key != LLMCache.make_key("prompt", None, 0.3)
+    assert key != LLMCache.make_key("prompt", "system", 0.4)
+
+
+def test_get_returns_stored_value():
+    cache = LLMCache()
+    key = cache.make_key("prompt", None, 0.3)
+    
+    async def run():
+        assert await cache.get(key) is None
+        await cache.set(key, {"answer": "A"})
+        return await cache.get(key)
+    
+    assert asyncio.run(run()) == {"answer": "A"}
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = LLMCache(ttl=60)
+    cache._memory = TTLCache(maxsize=8, ttl=60, timer=lambda: now[0])
+    
+    async def run():
+        await cache.set("key", {"answer": "A"})
+        now[0] = 59
+        fresh = await cache.get("key")
+        now[0] = 61
+        return fresh, await cache.get("key")
+    
+    assert asyncio.run(run()) == ({"answer": "A"}, None)
+
+
+def test_delete_evicts_entry():
+    cache = LLMCache()
+    
+    async def run():
+        await cache.set("key", {"answer": "A"})
+        await cache.delete("key")
+        await cache.delete("missing")
+        return await cache.get("key")
+    
+    assert asyncio.run(run()) is None
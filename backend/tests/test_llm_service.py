@@ -0,0 +1,191 @@
+"""
+Tests for LLM provider rate limiting and hedging.
+"""
+import asyncio
+from collections import deque
+import httpx
+import pytest
+from src.services import llm_service
+from src.services.llm_service import (
+    LLMOutputError,
+    LLMService,
+    LLMTransientError,
+    _rate_limiters,
+    _user_rate_limiters,
+    settings,
+)
+
+
+def test_rate_limiters_are_per_provider_and_key():
+    server = _rate_limiters("groq", "server-key")
+    
+    assert _rate_limiters("groq", "server-key") is server
+    assert _rate_limiters("groq", "user-key") is not server
+    assert _rate_limiters("gemini", "server-key") is not server
+
+
+def test_server_key_limiters_survive_user_key_eviction():
+    server = _rate_limiters("groq", settings.groq_api_key)
+    for index in range(llm_service.MAX_TRACKED_API_KEYS + 1):
+        _user_rate_limiters("groq", f"user-key-{index}")
+    
+    assert _rate_limiters("groq", settings.groq_api_key) is server
+
+
+def test_limits_are_split_across_workers(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 4)
+    requests, tokens = llm_service._new_rate_limiters("groq")
+    
+    assert requests.max_rate == settings.groq_max_requests_per_minute // 4
+    assert tokens.max_rate == settings.groq_max_tokens_per_minute // 4
+
+
+def test_exhausted_user_key_does_not_throttle_other_keys():
+    async def run():
+        _, user_tokens = _rate_limiters("groq", "busy-user-key")
+        await user_tokens.acquire(user_tokens.max_rate)
+        _, server_tokens = _rate_limiters("groq", "idle-server-key")
+        return user_tokens.has_capacity(1000), server_tokens.has_capacity(1000)
+    
+    assert asyncio.run(run()) == (False, True)
+
+
+def make_service(gemini, groq, gemini_key="gemini-key", groq_key="groq-key"):
+    """An LLMService whose provider calls are replaced by `gemini` / `groq` (None = no key)."""
+    service = LLMService()
+    service.gemini_api_key = gemini_key if gemini else None
+    service.groq_api_key = groq_key if groq else None
+    calls = []
+    
+    def fake(name, behaviour):
+        async def call(*args, hedge=False):
+            calls.append((name, hedge))
+            delay, outcome = behaviour
+            await asyncio.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome, 10
+        return call
+    
+    if gemini:
+        service._call_gemini = fake("Gemini", gemini)
+    if groq:
+        service._call_groq = fake("Groq", groq)
+    return service, calls
+
+
+def fast_gemini_history(monkeypatch, seconds: float = 0.01):
+    """Pretend Gemini's P95 latency is `seconds`."""
+    monkeypatch.setattr(llm_service, "_latencies", {"Gemini": deque([seconds] * 20)})
+
+
+def test_hedge_delay_follows_observed_p95(monkeypatch):
+    monkeypatch.setattr(llm_service, "_latencies", {})
+    assert llm_service._hedge_delay("Gemini") == llm_service.settings.llm_hedge_delay_ms / 1000
+    
+    for sample in range(1, 101):
+        llm_service._record_latency("Gemini", sample / 100)
+    assert 0.9 < llm_service._hedge_delay("Gemini") < 1.0
+
+
+def test_slow_primary_is_hedged_when_fallback_has_room(monkeypatch):
+    fast_gemini_history(monkeypatch)
+    service, calls = make_service(
+        gemini=(1, {"from": "gemini"}), groq=(0, {"from": "groq"}), groq_key="hedge-room-key"
+    )
+    
+    result = asyncio.run(service.generate_json("prompt"))
+    assert result == {"from": "groq"}
+    assert calls == [("Gemini", False), ("Groq", True)]
+
+
+def test_no_hedge_when_fallback_bucket_is_full(monkeypatch):
+    fast_gemini_history(monkeypatch)
+    service, calls = make_service(
+        gemini=(0.1, {"from": "gemini"}), groq=(0, {"from": "groq"}), groq_key="full-bucket-key"
+    )
+    
+    async def run():
+        _, groq_tokens = _rate_limiters("groq", "full-bucket-key")
+        await groq_tokens.acquire(groq_tokens.max_rate)
+        return await service.generate_json("prompt")
+    
+    assert asyncio.run(run()) == {"from": "gemini"}
+    assert calls == [("Gemini", False)]
+
+
+def test_failed_primary_falls_back_without_hedging(monkeypatch):
+    fast_gemini_history(monkeypatch, seconds=10)
+    service, calls = make_service(gemini=(0, Exception("boom")), groq=(0, {"from": "groq"}))
+    
+    assert asyncio.run(service.generate_json("prompt")) == {"from": "groq"}
+    assert calls == [("Gemini", False), ("Groq", False)]
+
+
+def test_cancelled_hedge_reserves_only_prompt_tokens(monkeypatch):
+    async def never_answers(send, max_retries=None):
+        await asyncio.sleep(10)
+    
+    monkeypatch.setattr(llm_service, "send_with_retry", never_answers)
+    service = LLMService()
+    
+    async def reserved_after_cancel(api_key: str, hedge: bool) -> bool:
+        service.groq_api_key = api_key
+        task = asyncio.create_task(service._call_groq("x" * 400, None, 0.3, 2000, hedge=hedge))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        _, groq_tokens = _rate_limiters("groq", api_key)
+        return groq_tokens.has_capacity(groq_tokens.max_rate - 1000)
+    
+    assert asyncio.run(reserved_after_cancel("hedge-charge-key", hedge=True))
+    assert not asyncio.run(reserved_after_cancel("fallback-charge-key", hedge=False))
+
+
+def test_undecodable_content_raises_output_error():
+    with pytest.raises(LLMOutputError, match="truncated"):
+        llm_service._parse_content('{"answer": "cut of', truncated=True)
+    with pytest.raises(LLMOutputError, match="not valid JSON"):
+        llm_service._parse_content("not json")
+    assert llm_service._parse_content('{"answer": "A"}') == {"answer": "A"}
+
+
+def test_output_error_from_a_provider_surfaces_as_output_error():
+    service, _ = make_service(gemini=(0, LLMOutputError("truncated")), groq=(0, Exception("down")))
+    
+    with pytest.raises(LLMOutputError):
+        asyncio.run(service.generate_json("prompt"))
+
+
+def test_transient_failures_from_every_provider_surface_as_transient():
+    service, _ = make_service(
+        gemini=(0, LLMTransientError("Gemini API error (503): overloaded")),
+        groq=(0, httpx.ReadTimeout("timed out")),
+    )
+    
+    with pytest.raises(LLMTransientError):
+        asyncio.run(service.generate_json("prompt"))
+
+
+def test_a_permanent_failure_is_not_reported_as_transient():
+    service, _ = make_service(
+        gemini=(0, LLMTransientError("Gemini API error (429): quota")),
+        groq=(0, Exception("Groq API error (401): invalid key")),
+    )
+    
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(service.generate_json("prompt"))
+    assert not isinstance(excinfo.value, LLMTransientError)
+
+
+def test_generation_cap_is_shared_across_api_keys(monkeypatch):
+    monkeypatch.setattr(llm_service, "_generation_semaphore", asyncio.Semaphore(1))
+    first, _ = make_service(gemini=None, groq=(0.05, {"n": 1}), groq_key="first-user-key")
+    second, _ = make_service(gemini=None, groq=(0.05, {"n": 2}), groq_key="second-user-key")
+    
+    async def run():
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(first.generate_json("a"), second.generate_json("b"))
+        return asyncio.get_running_loop().time() - start
+    
+    # With one slot, calls on different keys run one after the other
+    assert asyncio.run(run()) >= 0.1
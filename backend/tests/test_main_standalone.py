@@ -0,0 +1,31 @@
+"""
+Tests for the standalone (no database) app.
+"""
+import asyncio
+import orjson
+from src.main_standalone import (
+    ChapterResearchResponse,
+    _demo_payload_bytes,
+    app,
+    get_demo_response,
+    lifespan,
+)
+
+
+def test_lifespan_stops_the_timestamp_ticker():
+    async def run():
+        before = set(asyncio.all_tasks())
+        async with lifespan(app):
+            await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() - before if not task.done()]
+    
+    assert asyncio.run(run()) == []
+
+
+def test_demo_payload_round_trips_through_the_response_model():
+    body = _demo_payload_bytes("Economics", "Money and Banking", 12)
+    
+    parsed = ChapterResearchResponse.model_validate(orjson.loads(body))
+    expected = get_demo_response("Economics", "Money and Banking", 12)
+    assert parsed == expected.model_copy(update={"generated_at": parsed.generated_at})
+    assert parsed.processing_time_ms == 12
@@ -0,0 +1,282 @@
+"""
+Tests for the verification pipeline's cached, coalesced LLM calls.
+"""
+import asyncio
+import pytest
+from pydantic import ValidationError
+from src.models.schemas import Layer2Output, Layer3Output
+from src.services import verification_pipeline
+from src.services.llm_cache import LLMCache
+from src.services.llm_service import LLMOutputError, LLMTransientError
+from src.services.verification_pipeline import VerificationPipeline
+
+
+class FakeLLM:
+    """Stands in for LLMService, returning canned responses and counting calls."""
+    
+    def __init__(self, respond, delay: float = 0):
+        self.respond = respond
+        self.delay = delay
+        self.calls = []
+    
+    async def generate_json(self, prompt, system_message=None, temperature=0.3, max_tokens=2000):
+        self.calls.append((system_message, temperature))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.respond(prompt, system_message, temperature)
+
+
+def make_pipeline(respond, delay: float = 0) -> VerificationPipeline:
+    pipeline = VerificationPipeline()
+    pipeline.llm = FakeLLM(respond, delay)
+    pipeline.cache = LLMCache()
+    return pipeline
+
+
+def test_invalid_response_is_not_cached():
+    pipeline = make_pipeline(lambda *args: {"logical_errors": [], "severity": "unknown"})
+    
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ValidationError):
+                await pipeline._generate("prompt", "system", 0.3, Layer3Output)
+    
+    asyncio.run(run())
+    assert len(pipeline.llm.calls) == 2
+
+
+def test_valid_response_is_served_from_cache():
+    pipeline = make_pipeline(lambda *args: {"logical_errors": [], "severity": "none"})
+    
+    async def run():
+        first = await pipeline._generate("prompt", "system", 0.3, Layer3Output)
+        second = await pipeline._generate("prompt", "system", 0.3, Layer3Output)
+        return first, second
+    
+    first, second = asyncio.run(run())
+    assert first == second == Layer3Output(logical_errors=(), severity="none")
+    assert len(pipeline.llm.calls) == 1
+
+
+def layer_responses(first_answer_score: float):
+    """Canned layer outputs: the first layer 1 answer scores `first_answer_score`, later ones 90."""
+    answers = iter(range(1, 100))
+    
+    def respond(prompt, system_message, temperature):
+        if "teacher" in system_message:
+            return {
+                "answer": f"Answer {next(answers)}",
+                "key_points": [],
+                "referenced_concepts": [],
+                "confidence": 0.85,
+            }
+        if "syllabus expert" in system_message:
+            return {
+                "syllabus_alignment": "Aligned",
+                "missing_keywords": [],
+                "irrelevant_points": [],
+                "alignment_score": 90,
+            }
+        if "logical reasoning" in system_message:
+            return {"logical_errors": [], "severity": "none"}
+        score = first_answer_score if "Answer 1\n" in prompt else 90
+        return {
+            "predicted_score": 4,
+            "max_marks": 5,
+            "score_percentage": score,
+            "missing_components": [],
+        }
+    
+    return respond
+
+
+def test_repeat_question_is_served_from_cache():
+    pipeline = make_pipeline(layer_responses(first_answer_score=90))
+    
+    async def run():
+        first = await pipeline.process("What is GST?", "Economics")
+        calls = len(pipeline.llm.calls)
+        second = await pipeline.process("What is GST?", "Economics")
+        return first, second, calls
+    
+    first, second, calls = asyncio.run(run())
+    assert calls == 4
+    assert len(pipeline.llm.calls) == 4
+    assert second["final_answer"] == first["final_answer"]
+
+
+def test_retried_answer_replaces_rejected_cache_entry():
+    pipeline = make_pipeline(layer_responses(first_answer_score=50))
+    
+    async def run():
+        first = await pipeline.process("What is GST?", "Economics")
+        calls = len(pipeline.llm.calls)
+        second = await pipeline.process("What is GST?", "Economics")
+        return first, second, calls
+    
+    first, second, calls = asyncio.run(run())
+    assert first["retries"] == 1
+    assert first["layer1_output"]["answer"] == "Answer 2"
+    # The passing retry and its reviews are served from the cache
+    assert calls == 8
+    assert len(pipeline.llm.calls) == 8
+    assert second["retries"] == 0
+    assert second["layer1_output"]["answer"] == "Answer 2"
+
+
+def test_rejected_answer_is_evicted():
+    pipeline = make_pipeline(layer_responses(first_answer_score=50))
+    pipeline.max_retries = 0
+    
+    async def run():
+        await pipeline.process("What is GST?", "Economics")
+        return await pipeline.process("What is GST?", "Economics")
+    
+    second = asyncio.run(run())
+    assert second["layer1_output"]["answer"] == "Answer 2"
+
+
+def test_passing_speculative_answer_is_cached():
+    respond = layer_responses(first_answer_score=50)
+    
+    def low_confidence(prompt, system_message, temperature):
+        response = respond(prompt, system_message, temperature)
+        if "teacher" in system_message:
+            response["confidence"] = 0.7  # Below 0.8 starts a speculative replacement
+        return response
+    
+    pipeline = make_pipeline(low_confidence, delay=0.01)
+    
+    async def run():
+        first = await pipeline.process("What is GST?", "Economics")
+        calls = len(pipeline.llm.calls)
+        second = await pipeline.process("What is GST?", "Economics")
+        return first, second, calls
+    
+    first, second, calls = asyncio.run(run())
+    assert first["retries"] == 1
+    assert first["layer1_output"]["answer"] == "Answer 2"
+    assert second["layer1_output"]["answer"] == "Answer 2"
+    assert second["retries"] == 0
+
+
+REVIEW = {"logical_errors": [], "severity": "none"}
+
+
+def test_concurrent_identical_calls_share_one_request():
+    pipeline = make_pipeline(lambda *args: REVIEW, delay=0.01)
+    
+    async def run():
+        return await asyncio.gather(*(
+            pipeline._generate("prompt", "system", 0.3, Layer3Output) for _ in range(5)
+        ))
+    
+    results = asyncio.run(run())
+    assert len(set(results)) == 1
+    assert len(pipeline.llm.calls) == 1
+    assert not pipeline._inflight and not pipeline._waiters
+
+
+def test_last_waiter_leaving_cancels_the_shared_call():
+    pipeline = make_pipeline(lambda *args: REVIEW, delay=10)
+    
+    async def run():
+        waiter = asyncio.create_task(pipeline._generate("prompt", "system", 0.3, Layer3Output))
+        await asyncio.sleep(0.01)
+        shared = next(iter(pipeline._inflight.values()))
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return shared
+    
+    shared = asyncio.run(run())
+    assert shared.cancelled()
+    assert not pipeline._inflight and not pipeline._waiters
+
+
+def test_caller_arriving_as_last_waiter_leaves_gets_a_fresh_call():
+    pipeline = make_pipeline(lambda *args: REVIEW, delay=0.05)
+    
+    async def run():
+        first = asyncio.create_task(pipeline._generate("prompt", "system", 0.3, Layer3Output))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # Scheduled right behind the cancellation, before the shared call has unwound
+        second = asyncio.create_task(pipeline._generate("prompt", "system", 0.3, Layer3Output))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(run()) == Layer3Output(logical_errors=(), severity="none")
+    assert len(pipeline.llm.calls) == 2
+
+
+def test_derived_scorer_output_is_flagged_and_uses_question_marks():
+    pipeline = make_pipeline(lambda *args: REVIEW)
+    layer2 = Layer2Output(
+        syllabus_alignment="Aligned",
+        missing_keywords=(),
+        irrelevant_points=(),
+        alignment_score=96,
+    )
+    
+    layer4 = pipeline._derive_layer4("Explain GST. (6 marks)", layer2)
+    assert layer4.derived
+    assert layer4.max_marks == 6
+    assert layer4.predicted_score == 5.8
+    assert pipeline._derive_layer4("Explain GST.", layer2).max_marks == 5
+
+
+def test_fast_path_layers_are_flagged_as_derived():
+    respond = layer_responses(first_answer_score=95)
+    
+    def confident(prompt, system_message, temperature):
+        response = respond(prompt, system_message, temperature)
+        if "teacher" in system_message:
+            response["confidence"] = 0.97
+        return response
+    
+    pipeline = make_pipeline(confident)
+    
+    async def run():
+        first = await pipeline.process("What is GST? (4 marks)", "Economics", "Taxes")
+        calls = len(pipeline.llm.calls)
+        second = await pipeline.process("Explain VAT. (4 marks)", "Economics", "Taxes")
+        return first, second, calls
+    
+    first, second, calls = asyncio.run(run())
+    assert not first["fast_path"]
+    assert not first["layer4_output"]["derived"]
+    assert second["fast_path"]
+    assert len(pipeline.llm.calls) == calls + 1
+    assert all(second[f"layer{n}_output"]["derived"] for n in (2, 3, 4))
+    assert second["layer4_output"]["max_marks"] == 4
+
+
+@pytest.mark.parametrize("error, backs_off", [
+    (LLMTransientError("Groq API error (429): slow down"), True),
+    (LLMOutputError("Response content is not valid JSON"), False),
+])
+def test_only_transient_errors_back_off(monkeypatch, error, backs_off):
+    backoffs = []
+    
+    class Random:
+        @staticmethod
+        def uniform(low, high):
+            backoffs.append(high)
+            return 0
+    
+    monkeypatch.setattr(verification_pipeline, "random", Random)
+    respond = layer_responses(first_answer_score=90)
+    failures = [error]
+    
+    def flaky(prompt, system_message, temperature):
+        if failures:
+            raise failures.pop()
+        return respond(prompt, system_message, temperature)
+    
+    result = asyncio.run(make_pipeline(flaky).process("What is GST?", "Economics"))
+    assert result["status"] == "completed"
+    assert result["retries"] == 1
+    assert bool(backoffs) is backs_off
@@ -0,0 +1,23 @@
+"""
+Tests for aggregating SerpAPI results into chapter search content.
+"""
+import asyncio
+from src.services.web_search_service import WebSearchService
+
+
+def test_duplicate_links_keep_their_snippets():
+    service = WebSearchService()
+    
+    async def execute_search(query):
+        return {"organic_results": [
+            {"title": "NCERT", "link": "https://www.ncert.nic.in/money", "snippet": f"{query} snippet"},
+        ]}
+    
+    service._execute_search = execute_search
+    result = asyncio.run(service.search_cbse_content("Economics", "Money"))
+    
+    queries = list(dict.fromkeys(service._build_queries("Economics", "Money", "general")))
+    assert len(queries) > 1
+    assert [s.link for s in result["sources"]] == ["https://www.ncert.nic.in/money"]
+    assert result["sources"][0].source == "ncert.nic.in"
+    assert result["content_snippets"] == [f"{query} snippet" for query in queries]
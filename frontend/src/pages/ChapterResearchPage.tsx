@@ -41,6 +41,7 @@ const statusColors = {
   verified: 'bg-green-100 text-green-700 border-green-200',
   needs_review: 'bg-yellow-100 text-yellow-700 border-yellow-200',
   unreliable: 'bg-red-100 text-red-700 border-red-200',
+  unverified: 'bg-gray-100 text-gray-700 border-gray-200',
 };
 
 export function ChapterResearchPage() {
@@ -124,6 +125,8 @@ export function ChapterResearchPage() {
         toast.success(isDeepResearch ? 'Deep research complete!' : 'Research complete!');
       } else if (response.verification.status === 'needs_review') {
         toast('Research complete with warnings. Please review carefully.', { icon: '⚠️' });
+      } else if (response.verification.status === 'unverified') {
+        toast('Research complete. Syllabus and accuracy checks were skipped.', { icon: 'ℹ️' });
       } else {
         toast.error('Research completed but content may be unreliable.');
       }
@@ -624,6 +627,8 @@ export function ChapterResearchPage() {
                             ? 'Verified' 
                             : result.verification.status === 'needs_review'
                             ? 'Needs Review'
+                            : result.verification.status === 'unverified'
+                            ? 'Unverified'
                             : 'Unreliable'}
                         </Badge>
                         <span className="text-sm text-white/80">
@@ -47,7 +47,7 @@ export interface BoardQuestion {
 }
 
 export interface VerificationInfo {
-  status: 'verified' | 'needs_review' | 'unreliable';
+  status: 'verified' | 'needs_review' | 'unreliable' | 'unverified';
   confidence_score: number;
   syllabus_alignment: number;
   completeness: number;
@@ -70,6 +70,8 @@ export interface ChapterResearchResponse {
   mnemonics: string[] | null;
   sources: SourceInfo[];
   verification: VerificationInfo;
+  fast_path?: boolean; // syllabus and accuracy checks were skipped
+  cache_tier?: 'memory' | 'redis' | null; // null when freshly researched
   warnings: string[] | null;
   processing_time_ms: number;
   generated_at: string;
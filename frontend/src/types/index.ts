@@ -44,11 +44,13 @@ export interface Layer2Output {
   missing_keywords: string[];
   irrelevant_points: string[];
   alignment_score: number;
+  derived?: boolean;
 }
 
 export interface Layer3Output {
   logical_errors: string[];
   severity: 'none' | 'low' | 'medium' | 'high';
+  derived?: boolean;
 }
 
 export interface Layer4Output {
@@ -56,6 +58,7 @@ export interface Layer4Output {
   max_marks: number;
   score_percentage: number;
   missing_components: string[];
+  derived?: boolean;
 }
 
 export interface Answer {